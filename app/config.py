@@ -4,63 +4,98 @@ Enhanced Configuration with Multi-LLM Provider Support
 import os
 from pathlib import Path
 from enum import Enum
+from dataclasses import dataclass
+from functools import lru_cache
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Snapshot the environment once; os.environ lookups go through the
+# _Environ proxy (encodekey/decodevalue) on every access.
+_env = dict(os.environ)
+
 
 class LLMProvider(str, Enum):
     """Supported LLM Providers"""
     OPENAI = "openai"
     OPENROUTER = "openrouter"
 
+@dataclass(slots=True, frozen=True)
 class Settings:
     # ---------------------------
     # API Configuration
     # ---------------------------
-    API_HOST = os.getenv("API_HOST", "localhost")
-    API_PORT = int(os.getenv("API_PORT", "8000"))
-    API_RELOAD = os.getenv("API_RELOAD", "True").lower() == "true"
+    API_HOST: str = _env.get("API_HOST", "localhost")
+    API_PORT: int = int(_env.get("API_PORT", "8000"))
+    API_RELOAD: bool = _env.get("API_RELOAD", "True").lower() == "true"
     
     # ---------------------------
     # .NET API Integration
     # ---------------------------
-    DOTNET_API_URL: str = os.getenv("DOTNET_API_URL", "https://api.veridianurbansystems.com")
+    DOTNET_API_URL: str = _env.get("DOTNET_API_URL", "https://api.veridianurbansystems.com")
     
-    Application_Auth_API_KEY: str= os.getenv("Application_Auth_API_KEY", "v1-abac4b8a0947535005d4595b2c05fce0b3ae9ab2872451d3d259451f36e03bd2")
+    Application_Auth_API_KEY: str= _env.get("Application_Auth_API_KEY", "v1-abac4b8a0947535005d4595b2c05fce0b3ae9ab2872451d3d259451f36e03bd2")
 
     # ---------------------------
     # Database Configuration
     # ---------------------------
-    DB_SERVER: str = os.getenv("DB_SERVER", "DESKTOP-I0TTFPS")
-    DB_NAME: str = os.getenv("DB_NAME", "AssessmentDB_new")
-    DB_USE_WINDOWS_AUTH: bool = os.getenv("DB_USE_WINDOWS_AUTH", "True").lower() == "true"
-    DB_USERNAME: str = os.getenv("DB_USERNAME", "")
-    DB_PASSWORD: str = os.getenv("DB_PASSWORD", "")
+    DB_SERVER: str = _env.get("DB_SERVER", "DESKTOP-I0TTFPS")
+    DB_NAME: str = _env.get("DB_NAME", "AssessmentDB_new")
+    DB_USE_WINDOWS_AUTH: bool = _env.get("DB_USE_WINDOWS_AUTH", "True").lower() == "true"
+    DB_USERNAME: str = _env.get("DB_USERNAME", "")
+    DB_PASSWORD: str = _env.get("DB_PASSWORD", "")
     
     # ---------------------------
     # LLM Provider Configuration
     # ---------------------------
-    LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "openai")
+    LLM_PROVIDER: str = _env.get("LLM_PROVIDER", "openai")
+    # Multiplex concurrent LLM calls over HTTP/2 connections (needs the h2 package)
+    LLM_HTTP2: bool = _env.get("LLM_HTTP2", "False").lower() == "true"
+    # Open the provider connection at startup so the first research call skips the handshake
+    LLM_WARMUP: bool = _env.get("LLM_WARMUP", "True").lower() == "true"
     
     
     # OpenAI Configuration
-    OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
-    OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-    OPENAI_TEMPERATURE: float = float(os.getenv("OPENAI_TEMPERATURE", "0.1"))
+    OPENAI_API_KEY: str = _env.get("OPENAI_API_KEY", "")
+    OPENAI_MODEL: str = _env.get("OPENAI_MODEL", "gpt-4o-mini")
+    OPENAI_TEMPERATURE: float = float(_env.get("OPENAI_TEMPERATURE", "0.1"))
     
     # OpenRouter Configuration (uses OpenAI-compatible API)
-    OPENROUTER_API_KEY: str = os.getenv("OPENROUTER_API_KEY", "")
-    OPENROUTER_MODEL: str = os.getenv("OPENROUTER_MODEL", "google/gemini-2.0-flash-exp:free")
-    OPENROUTER_BASE_URL: str = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+    OPENROUTER_API_KEY: str = _env.get("OPENROUTER_API_KEY", "")
+    OPENROUTER_MODEL: str = _env.get("OPENROUTER_MODEL", "google/gemini-2.0-flash-exp:free")
+    OPENROUTER_BASE_URL: str = _env.get("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+    # App attribution headers sent with every OpenRouter request
+    OPENROUTER_REFERER: str = _env.get("OPENROUTER_REFERER", "http://localhost:8000")
+    OPENROUTER_APP_TITLE: str = _env.get("OPENROUTER_APP_TITLE", "AI Microservice")
+    # Ask OpenRouter to cache the static prompt prefix (Anthropic-style cache_control)
+    OPENROUTER_PROMPT_CACHE: bool = _env.get("OPENROUTER_PROMPT_CACHE", "False").lower() == "true"
  
 
     # ---------------------------
     # Data Analysis Configuration
     # ---------------------------
-    MAX_RECORDS_FOR_ANALYSIS: int = int(os.getenv("MAX_RECORDS_FOR_ANALYSIS", "1000"))
-    SAMPLE_SIZE: int = int(os.getenv("SAMPLE_SIZE", "100"))
-    USE_SAMPLING: bool = os.getenv("USE_SAMPLING", "True").lower() == "true"
+    MAX_RECORDS_FOR_ANALYSIS: int = int(_env.get("MAX_RECORDS_FOR_ANALYSIS", "1000"))
+    SAMPLE_SIZE: int = int(_env.get("SAMPLE_SIZE", "100"))
+    USE_SAMPLING: bool = _env.get("USE_SAMPLING", "True").lower() == "true"
+
+    # Max concurrent LLM research calls across the whole process
+    RESEARCH_CONCURRENCY: int = int(_env.get("RESEARCH_CONCURRENCY", "16"))
+    # Questions of one pillar sent per research prompt; 1 = one call per question.
+    # Each answer is a few hundred tokens, so keep batch * ~600 under LLM_MAX_TOKENS
+    RESEARCH_QUESTION_BATCH_SIZE: int = int(_env.get("RESEARCH_QUESTION_BATCH_SIZE", "1"))
+    # Max cities analysed at once by a full (all cities) analysis run
+    ANALYSIS_CITY_CONCURRENCY: int = int(_env.get("ANALYSIS_CITY_CONCURRENCY", "4"))
+    # Token budget for the pillar findings sent with a city prompt (0 disables the cap)
+    RESEARCH_CONTEXT_TOKEN_BUDGET: int = int(_env.get("RESEARCH_CONTEXT_TOKEN_BUDGET", "8000"))
+    # Background analysis admission: queued jobs beyond ANALYSIS_QUEUE_SIZE get a 429
+    ANALYSIS_WORKERS: int = int(_env.get("ANALYSIS_WORKERS", "4"))
+    ANALYSIS_QUEUE_SIZE: int = int(_env.get("ANALYSIS_QUEUE_SIZE", "256"))
+
+    # In-process cache of successful research results (TTL in seconds, 0 disables)
+    RESEARCH_CACHE_MAX_ENTRIES: int = int(_env.get("RESEARCH_CACHE_MAX_ENTRIES", "2048"))
+    RESEARCH_CACHE_QUESTION_TTL: int = int(_env.get("RESEARCH_CACHE_QUESTION_TTL", "86400"))
+    RESEARCH_CACHE_PILLAR_TTL: int = int(_env.get("RESEARCH_CACHE_PILLAR_TTL", "21600"))
+    RESEARCH_CACHE_CITY_TTL: int = int(_env.get("RESEARCH_CACHE_CITY_TTL", "3600"))
     
     # ---------------------------
     # Processing Settings
@@ -82,11 +117,13 @@ class Settings:
     # General Paths
     # ---------------------------
     BASE_DIR: Path = Path(__file__).parent.parent
-    
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Build the settings once; later calls return the cached instance"""
+    return Settings()
+
+
+settings = get_settings()
 
@@ -2,43 +2,114 @@
 Main FastAPI Application with Database Logging and API Key Authentication
 """
 
-import os
+import asyncio
 import logging
+import logging.config
+import orjson
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
-from fastapi.security import APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
+from fastapi.staticfiles import StaticFiles
 from fastapi.openapi.utils import get_openapi
-from fastapi.openapi.docs import get_swagger_ui_html
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
 from app.config import settings
 from app.services.common.database_service import db_service
 from app.services.common.db_logger_service import db_logger_service
+from app.services.common.veridian_ai_research_service import veridian_ai_research_service
+from app.services.common.llm_factory import close_http_clients, llm_factory
+from app.services.common.task_manager import task_manager
+from app.services.common.analysis_queue import analysis_queue
 from app.middleware.auth_middleware import APIKeyMiddleware
 
 # Import routers
 from app.routers.score_analysis_router import router as score_analysis_router
 
 
-# Configure logging to database
+# Configure logging once: the queue handler sits on the root logger only and
+# module loggers propagate to it, so every record is enqueued exactly once
+LOGGING_CONFIG = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        # Loggers only enqueue records; the handler's flusher thread
+        # does the (batched) DB writes
+        "db_queue": {
+            "()": db_logger_service.get_handler,
+            "level": "ERROR",
+        },
+    },
+    "loggers": {
+        __name__: {"level": "ERROR"},
+    },
+    "root": {
+        "level": "WARNING",
+        "handlers": ["db_queue"],
+    },
+}
+logging.config.dictConfig(LOGGING_CONFIG)
+
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.ERROR)
 
-# Add database handler
-db_handler = db_logger_service.get_handler()
-db_handler.setLevel(logging.ERROR)
-formatter = logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s")
-db_handler.setFormatter(formatter)
-logger.addHandler(db_handler)
 
-# Also configure root logger to use database
-root_logger = logging.getLogger()
-root_logger.setLevel(logging.INFO)
-root_logger.addHandler(db_handler)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize services on startup and clean up on shutdown"""
+    logger.info("🚀 Starting AI Microservice...")
+    
+    try:
+        # Batch log_message/log_exception rows into AppLogs off the request path
+        await db_logger_service.start_writer()
+        # Background analyses are admitted through a bounded queue and worker pool
+        analysis_queue.start()
+
+        # Run the DB check and AppLogs DDL (blocking pyodbc, so in threads)
+        # and LLM init together
+        logger.info("Testing database connection...")
+        db_connected, llm_result, _ = await asyncio.gather(
+            asyncio.to_thread(db_service.test_connection),
+            veridian_ai_research_service.initialize(),
+            asyncio.to_thread(db_logger_service.ensure_table_exists),
+            return_exceptions=True,
+        )
+        
+        if db_connected is not True:
+            logger.warning("⚠️ Database connection failed - some features may not work")
+
+        if isinstance(llm_result, Exception):
+            logger.warning("⚠️ LLM initialization failed - will retry on first use: %s", llm_result)
+        elif settings.LLM_WARMUP:
+            # In the background so a slow provider never delays startup
+            task_manager.create_task(
+                llm_factory.warmup(veridian_ai_research_service.llm), name="llm-warmup"
+            )
+
+        # Build the OpenAPI schema now so the first /docs load doesn't pay for it
+        app.openapi()
 
+        logger.info("✅ All services initialized successfully!")
+        logger.info("🔐 API Key authentication is enabled")
+        logger.info(
+            "📚 API docs at http://%s:%s/docs", settings.API_HOST, settings.API_PORT
+        )
+
+    except Exception as e:
+        logger.error("❌ Startup failed: %s", e, exc_info=True)
+        raise
+
+    yield
 
-# Define API Key security scheme
-api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+    logger.info("Shutting down AI Microservice...")
+    # Cancel in-flight analyses and the queue workers first so their last
+    # log rows still get flushed; jobs still waiting in the queue are dropped
+    if analysis_queue.pending_count:
+        logger.warning("Dropping %s queued analysis job(s) at shutdown", analysis_queue.pending_count)
+    await task_manager.shutdown()
+    await close_http_clients()
+    await db_logger_service.stop_writer()
+    # Flush queued log records to the database before the process exits
+    db_logger_service.stop_log_handler()
 
 
 # Create FastAPI app
@@ -48,6 +119,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url=None,  # Disable default docs to customize
     redoc_url=None,  # Disable default redoc to customize
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # CORS middleware (add before auth middleware)
@@ -69,8 +142,8 @@ def custom_openapi():
         return app.openapi_schema
     
     openapi_schema = get_openapi(
-        title="Assessment AI Service",
-        version="1.0.0",
+        title=app.title,
+        version=app.version,
         description="Analysis API with API Key Authentication",
         routes=app.routes,
     )
@@ -86,12 +159,16 @@ def custom_openapi():
     }
     
     # Apply security globally to all endpoints except excluded ones
-    excluded_paths = ["/health", "/docs", "/redoc", "/openapi.json"]
-    for path, path_item in openapi_schema["paths"].items():
-        if path not in excluded_paths:
-            for method in path_item.values():
-                if isinstance(method, dict) and "security" not in method:
-                    method["security"] = [{"APIKeyHeader": []}]
+    excluded_paths = APIKeyMiddleware.EXCLUDED_PATHS
+    operations = [
+        operation
+        for path, path_item in openapi_schema["paths"].items()
+        if path not in excluded_paths
+        for operation in path_item.values()
+        if isinstance(operation, dict) and "security" not in operation
+    ]
+    for operation in operations:
+        operation["security"] = [{"APIKeyHeader": []}]
     
     app.openapi_schema = openapi_schema
     return app.openapi_schema
@@ -100,14 +177,18 @@ def custom_openapi():
 app.openapi = custom_openapi
 
 
+# Swagger UI assets are vendored under app/static so /docs works without the CDN
+app.mount("/static", StaticFiles(directory=settings.BASE_DIR / "app" / "static"), name="static")
+
+
 # Custom Swagger UI with persistence
 @app.get("/docs", include_in_schema=False)
 async def custom_swagger_ui_html():
     return get_swagger_ui_html(
         openapi_url="/openapi.json",
-        title="Assessment AI Service - Swagger UI",
-        swagger_js_url="https://cdn.jsdelivr.net/npm/swagger-ui-dist@5.9.0/swagger-ui-bundle.js",
-        swagger_css_url="https://cdn.jsdelivr.net/npm/swagger-ui-dist@5.9.0/swagger-ui.css",
+        title=f"{app.title} - Swagger UI",
+        swagger_js_url="/static/swagger/swagger-ui-bundle.js",
+        swagger_css_url="/static/swagger/swagger-ui.css",
         swagger_ui_parameters={
             "persistAuthorization": True,  # Remember API key in browser
             "displayRequestDuration": True,
@@ -119,10 +200,9 @@ async def custom_swagger_ui_html():
 # Custom ReDoc
 @app.get("/redoc", include_in_schema=False)
 async def redoc_html():
-    from fastapi.openapi.docs import get_redoc_html
     return get_redoc_html(
         openapi_url="/openapi.json",
-        title="Assessment AI Service - ReDoc"
+        title=f"{app.title} - ReDoc"
     )
 
 
@@ -133,7 +213,7 @@ async def global_exception_handler(request: Request, exc: Exception):
     Catch all unhandled exceptions and log them to database
     """
     logger.error(
-        f"Unhandled exception at {request.url.path}",
+        "Unhandled exception at %s", request.url.path,
         exc_info=exc,
         extra={
             "method": request.method,
@@ -143,7 +223,7 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
     
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
@@ -153,60 +233,35 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize services on startup"""
-    logger.info("🚀 Starting AI Microservice...")
-    
-    try:
-
-        # Test database connection
-        logger.info("Testing database connection...")
-        db_connected = db_service.test_connection()
-        
-        if not db_connected:
-            logger.warning("⚠️ Database connection failed - some features may not work")
-
-        logger.info("✅ All services initialized successfully!")
-        logger.info("🔐 API Key authentication is enabled")
-        logger.info(
-            f"📚 API docs at http://{settings.API_HOST}:{settings.API_PORT}/docs"
-        )
-
-    except Exception as e:
-        logger.error(f"❌ Startup failed: {e}", exc_info=True)
-        raise
+# Include routers
+app.include_router(score_analysis_router)
 
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on shutdown"""
-    logger.info("Shutting down AI Microservice...")
+# Settings are immutable after startup, so both bodies are encoded once
+_ROOT_BODY = orjson.dumps({
+    "service": "Assessment AI Service",
+    "status": "running",
+    "model_in_use": settings.LLM_PROVIDER,
+    "routes": {
+        "health_check": "/health",
+        "documentation": f"http://{settings.API_HOST}:{settings.API_PORT}/docs",
+        "openapi_json": f"http://{settings.API_HOST}/openapi.json",
+    },
+})
 
-
-# Include routers
-app.include_router(score_analysis_router)
+_HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "database": settings.DB_NAME,
+})
 
 
 # Root Endpoint (requires API key)
 @app.get("/", summary="API Root", tags=["General"])
 async def root():
-    return {
-        "service": "Assessment AI Service",
-        "status": "running",
-        "model_in_use": settings.LLM_PROVIDER,
-        "routes": {
-            "health_check": "/health",
-            "documentation": f"http://{settings.API_HOST}:{settings.API_PORT}/docs",
-            "openapi_json": f"http://{settings.API_HOST}/openapi.json",
-        },
-    }
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 
 # Health Check Endpoint (no API key required)
 @app.get("/health", summary="Health Check", tags=["Health"])
 async def health_check():
-    return {
-        "status": "healthy",
-        "database": settings.DB_NAME,
-    }
+    return Response(content=_HEALTH_BODY, media_type="application/json")
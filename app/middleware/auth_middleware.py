@@ -3,61 +3,90 @@
 API Key Authentication Middleware
 """
 
-from fastapi import Request, status
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import status
+from fastapi.responses import ORJSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 from app.config import settings
+import hmac
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+# Expected key encoded once; compared in constant time on every request
+_EXPECTED_KEY = settings.Application_Auth_API_KEY.encode("utf-8")
 
-class APIKeyMiddleware(BaseHTTPMiddleware):
+
+class APIKeyMiddleware:
     """
-    Middleware to validate API key in request headers
+    Pure ASGI middleware to validate API key in request headers
+    (avoids the per-request task group and body stream of BaseHTTPMiddleware)
     """
-    
+
     # Routes that don't require authentication
-    EXCLUDED_PATHS = [
+    EXCLUDED_PATHS = frozenset({
         "/docs",
         "/redoc",
         "/openapi.json",
         "/health",
-    ]
-    
-    async def dispatch(self, request: Request, call_next):
+    })
+    # Excluded routes plus their sub-paths (e.g. /docs/oauth2-redirect) and
+    # the vendored Swagger UI assets, matched in a single anchored regex
+    _SKIP_RE = re.compile(r"^(?:/docs|/redoc|/openapi\.json|/health|/static)(?:/|$)")
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+        method = scope["method"]
+
+        # CORS preflights never carry the API key; let CORSMiddleware answer them
+        if method == "OPTIONS":
+            return await self.app(scope, receive, send)
+
         # Skip authentication for excluded paths
-        if any(request.url.path.startswith(path) for path in self.EXCLUDED_PATHS):
-            return await call_next(request)
-        
-        # Get API key from header
-        api_key = request.headers.get("X-API-Key")  # or request.headers.get("Authorization")
-        
-        # # Remove "Bearer " prefix if present
-        # if api_key and api_key.startswith("Bearer "):
-        #     api_key = api_key[7:]
-        
+        if self._SKIP_RE.match(path):
+            return await self.app(scope, receive, send)
+
+        # Get API key from header (ASGI header names are lowercase bytes);
+        # X-API-Key wins, "Authorization: Bearer <key>" is the fallback
+        api_key = None
+        auth = None
+        for name, value in scope["headers"]:
+            if name == b"x-api-key":
+                api_key = value
+                break
+            if name == b"authorization" and auth is None:
+                auth = value
+        if api_key is None and auth and auth[:7] == b"Bearer ":
+            api_key = auth[7:]
+
         # Validate API key
         if not api_key:
-            logger.warning(f"Missing API key for {request.method} {request.url.path}")
-            return JSONResponse(
+            logger.warning("Missing API key for %s %s", method, path)
+            response = ORJSONResponse(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 content={
                     "error": "Unauthorized",
                     "message": "API key is missing. Please provide X-API-Key header."
                 }
             )
-        
-        if api_key != settings.Application_Auth_API_KEY:
-            logger.warning(f"Invalid API key attempt for {request.method} {request.url.path}")
-            return JSONResponse(
+            return await response(scope, receive, send)
+
+        if not hmac.compare_digest(api_key, _EXPECTED_KEY):
+            logger.warning("Invalid API key attempt for %s %s", method, path)
+            response = ORJSONResponse(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 content={
                     "error": "Unauthorized",
                     "message": "Invalid API key."
                 }
             )
-        
+            return await response(scope, receive, send)
+
         # API key is valid, proceed with request
-        response = await call_next(request)
-        return response
\ No newline at end of file
+        await self.app(scope, receive, send)
@@ -4,236 +4,241 @@ Fire-and-forget pattern for long-running analysis tasks
 """
 import logging
 import asyncio
-from fastapi import APIRouter, HTTPException
+import inspect
+import orjson
+from typing import Any, AsyncIterator, Callable, Coroutine, NamedTuple, Tuple
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from app.view_models.AnalysisRequest import AnalysisResponse
 from app.services.score_analyzer_service import score_analyzer_service
+from app.services.common.db_logger_service import db_logger_service
+from app.services.common.analysis_queue import analysis_queue
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/cities-score-analysis", tags=["Score Analysis"])
 
+# Task names of analyses that are queued or running; the name encodes the
+# endpoint and its ids, so a repeat POST for the same work is coalesced
+_active_analyses: set[str] = set()
 
-# Background task wrapper with error handling
-async def run_analysis_task(task_name: str, coro):
-    """
-    Wrapper to run analysis tasks in background with proper error handling
-    """
-    try:
-        await coro
+# Shared by /analyze/full and its streaming variant, so only one all-cities run exists at a time
+_ALL_CITIES_TASK = "analyze_all_cities_full"
 
-    except Exception as e:
-        error_msg = f"Background task '{task_name}' failed: {str(e)}"
-        logger.error(error_msg, exc_info=True)
 
-
-@router.post("/analyze/full", response_model=AnalysisResponse)
-async def analyze_all_cities_full():
+def _enqueue(task_name: str, job: Callable[[], Coroutine]) -> bool:
     """
-    Analyze table data and provide global summary for the assessment result for all cities
-    Returns immediately while analysis runs in background
+    Queue an analysis for the background workers; job is a zero-argument factory
+    so the coroutine is only created when a worker runs it
+
+    Returns False (and queues nothing) if the same analysis is already pending
     """
+    if task_name in _active_analyses:
+        logger.info("Analysis '%s' already in progress, not queuing it again", task_name)
+        return False
+
     try:
-        # Start analysis in background
-        asyncio.create_task(
-            run_analysis_task(
-                "analyze_all_cities_full",
-                score_analyzer_service.analyze_all_cities_questions()
-            )
-        )
-        
-        return AnalysisResponse(
-            success=True,
-            message="City analysis started successfully. Processing in background.",
+        analysis_queue.submit(task_name, lambda: run_analysis_task(task_name, job()))
+    except asyncio.QueueFull:
+        logger.warning("Analysis queue full, rejecting '%s'", task_name)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many analyses queued. Please retry later.",
         )
-            
-    except Exception as e:
-        error_msg = f"Error starting city analysis: {str(e)}"
-        logger.error(error_msg, exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
 
+    _active_analyses.add(task_name)
+    return True
 
-@router.post("/analyze/{city_id}/full", response_model=AnalysisResponse)
-async def analyze_single_city_full(city_id: int):
-    """
-    Analyze table data and provide global summary for a single city
-    Returns immediately while analysis runs in background
-    """
-    try:
-        if not city_id:
-            raise HTTPException(status_code=400, detail="City ID is required")
-        
-        # Start analysis in background
-        asyncio.create_task(
-            run_analysis_task(
-                f"analyze_single_city_full_{city_id}",
-                score_analyzer_service.analyze_all_cities_questions(city_id)
-            )
-        )
-        
-        return AnalysisResponse(
-            success=True,
-            message=f"City {city_id} analysis started successfully. Processing in background.",
-        )
-            
-    except HTTPException:
-        raise
-    except Exception as e:
-        error_msg = f"Error starting single city analysis (ID: {city_id}): {str(e)}"
-        logger.error(error_msg, exc_info=True)
-        
-        raise HTTPException(status_code=500, detail=str(e))
-
-    
-@router.post("/analyze/{city_id}", response_model=AnalysisResponse)
-async def analyze_single_City(city_id: int):
+
+def _started(message: str) -> ORJSONResponse:
     """
-    Analyze only the city summary (no pillars/questions)
-    Returns immediately while analysis runs in background
+    Build the "analysis started" reply directly; returning a Response skips the
+    response_model validation round-trip, which stays declared for the OpenAPI docs
     """
-    try:
-        if not city_id:
-            raise HTTPException(status_code=400, detail="City ID is required")
-        
-        # Start analysis in background
-        asyncio.create_task(
-            run_analysis_task(
-                f"analyze_single_city_{city_id}",
-                score_analyzer_service.analyze_single_City(city_id)
-            )
-        )
-        
-        return AnalysisResponse(
-            success=True,
-            message=f"City {city_id} analysis started successfully. Processing in background.",
-        )
-            
-    except HTTPException:
-        raise
-    except Exception as e:
-        error_msg = f"Error starting single city analysis (ID: {city_id}): {str(e)}"
-        logger.error(error_msg, exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    return ORJSONResponse(
+        {"success": True, "message": message, "data": None},
+        status_code=status.HTTP_202_ACCEPTED,
+    )
 
 
-@router.post("/analyze/{city_id}/pillars", response_model=AnalysisResponse)
-async def analyze_city_pillars(city_id: int):
+# Background task wrapper with error handling
+async def run_analysis_task(task_name: str, coro):
     """
-    Analyze pillars for a specific city
-    Returns immediately while analysis runs in background
+    Wrapper to run analysis tasks in background with proper error handling
     """
     try:
-        if not city_id:
-            raise HTTPException(status_code=400, detail="City ID is required")
-        
-        # Start analysis in background
-        asyncio.create_task(
-            run_analysis_task(
-                f"analyze_city_pillars_{city_id}",
-                score_analyzer_service.analyze_city_pillars(city_id)
-            )
-        )
-        
-        return AnalysisResponse(
-            success=True,
-            message=f"City {city_id} pillar analysis started successfully. Processing in background.",
-        )
-            
-    except HTTPException:
+        await coro
+
+    except asyncio.CancelledError:
+        # Shutdown cancelled the analysis; record it, then let the cancellation propagate
+        db_logger_service.log_message("WARNING", f"Background task '{task_name}' cancelled during shutdown")
         raise
+
     except Exception as e:
-        error_msg = f"Error starting pillar analysis (ID: {city_id}): {str(e)}"
-        logger.error(error_msg, exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error("Background task '%s' failed: %s", task_name, e, exc_info=True)
+
+    finally:
+        _active_analyses.discard(task_name)
+
+
+# Marks the end of a streamed job's results
+_STREAM_END = object()
+
 
-  
-@router.post("/analyze/{city_id}/questions", response_model=AnalysisResponse)
-async def analyze_questions_of_city(city_id: int):
+async def _feed_updates(updates: asyncio.Queue, items: AsyncIterator[dict[str, Any]]):
     """
-    Analyze all questions for all pillars of a city
-    Returns immediately while analysis runs in background
+    Queued job body for a streamed analysis: push each result (then an error,
+    if any, and _STREAM_END) to the subscriber; the job runs to completion
+    even if the client goes away, like any other queued analysis
     """
     try:
-        if not city_id:
-            raise HTTPException(status_code=400, detail="City ID is required")
-        
-        # Start analysis in background
-        asyncio.create_task(
-            run_analysis_task(
-                f"analyze_questions_of_city_{city_id}",
-                score_analyzer_service.analyze_questions_of_city_pillar(city_id)
-            )
-        )
-        
-        return AnalysisResponse(
-            success=True,
-            message=f"City {city_id} questions analysis started successfully. Processing in background.",
-        )
-            
-    except HTTPException:
-        raise
+        async for item in items:
+            updates.put_nowait(item)
     except Exception as e:
-        error_msg = f"Error starting questions analysis (ID: {city_id}): {str(e)}"
-        logger.error(error_msg, exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+        updates.put_nowait(e)
+        raise
+    finally:
+        updates.put_nowait(_STREAM_END)
+
+
+async def _subscribe(updates: asyncio.Queue) -> AsyncIterator[dict[str, Any]]:
+    """Yield a queued job's results as _feed_updates publishes them"""
+    while (item := await updates.get()) is not _STREAM_END:
+        if isinstance(item, Exception):
+            raise item
+        yield item
 
 
-@router.post("/analyze/{city_id}/pillars/{pillar_id}/questions", response_model=AnalysisResponse)
-async def analyze_questions_of_city_pillar(city_id: int, pillar_id: int):
+async def _ndjson_stream(task_name: str, items):
     """
-    Analyze all questions of a particular pillar for a city
-    Returns immediately while analysis runs in background
+    Encode an async iterator of dicts as NDJSON lines; once streaming has started
+    a failure can't become a 500, so it is logged and sent as a final error line
     """
     try:
-        if not city_id:
-            raise HTTPException(status_code=400, detail="City ID is required")
-        
-        # Start analysis in background
-        asyncio.create_task(
-            run_analysis_task(
-                f"analyze_questions_city_{city_id}_pillar_{pillar_id}",
-                score_analyzer_service.analyze_questions_of_city_pillar(city_id, pillar_id)
-            )
-        )
-        
-        return AnalysisResponse(
-            success=True,
-            message=f"City {city_id} pillar {pillar_id} questions analysis started successfully. Processing in background.",
-        )
-            
-    except HTTPException:
-        raise
+        async for item in items:
+            yield orjson.dumps(item) + b"\n"
     except Exception as e:
-        error_msg = f"Error starting pillar questions analysis (City: {city_id}, Pillar: {pillar_id}): {str(e)}"
-        logger.error(error_msg, exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
-    
-
-    
-@router.post("/analyze/{city_id}/single-pillar/{pillar_id}", response_model=AnalysisResponse)
-async def analyze_single_pillar(city_id: int, pillar_id: int):
-    """
-    Analyze single pillar for a city
-    Returns immediately while analysis runs in background
-    """
-    try:
-        if not city_id and not pillar_id: 
-            raise HTTPException(status_code=400, detail="provide required parameter")
-        
+        logger.error("Streaming task '%s' failed: %s", task_name, e, exc_info=True)
+        yield orjson.dumps({"success": False, "error": str(e)}) + b"\n"
+
+
+class _AnalysisEndpoint(NamedTuple):
+    """One fire-and-forget analysis route"""
+    path: str
+    name: str
+    method: str                # score_analyzer_service coroutine method
+    params: Tuple[str, ...]    # int path params, passed positionally to method
+    task_name: str             # background task name, formatted with the params
+    message: str               # "started" message, formatted with the params
+    doc: str
+    required: Tuple[str, ...] = ("city_id",)  # at least one must be non-zero
+    required_detail: str = "City ID is required"
+
+
+# Registration order matters: /analyze/full must precede /analyze/{city_id}
+_ENDPOINTS = (
+    _AnalysisEndpoint(
+        "/analyze/full", "analyze_all_cities_full", "analyze_all_cities_questions", (),
+        _ALL_CITIES_TASK,
+        "City analysis started successfully. Processing in background.",
+        "Analyze table data and provide global summary for the assessment result for all cities",
+        required=(),
+    ),
+    _AnalysisEndpoint(
+        "/analyze/{city_id}/full", "analyze_single_city_full", "analyze_all_cities_questions", ("city_id",),
+        "analyze_single_city_full_{city_id}",
+        "City {city_id} analysis started successfully. Processing in background.",
+        "Analyze table data and provide global summary for a single city",
+    ),
+    _AnalysisEndpoint(
+        "/analyze/{city_id}", "analyze_single_City", "analyze_single_City", ("city_id",),
+        "analyze_single_city_{city_id}",
+        "City {city_id} analysis started successfully. Processing in background.",
+        "Analyze only the city summary (no pillars/questions)",
+    ),
+    _AnalysisEndpoint(
+        "/analyze/{city_id}/pillars", "analyze_city_pillars", "analyze_city_pillars", ("city_id",),
+        "analyze_city_pillars_{city_id}",
+        "City {city_id} pillar analysis started successfully. Processing in background.",
+        "Analyze pillars for a specific city",
+    ),
+    _AnalysisEndpoint(
+        "/analyze/{city_id}/questions", "analyze_questions_of_city", "analyze_questions_of_city_pillar", ("city_id",),
+        "analyze_questions_of_city_{city_id}",
+        "City {city_id} questions analysis started successfully. Processing in background.",
+        "Analyze all questions for all pillars of a city",
+    ),
+    _AnalysisEndpoint(
+        "/analyze/{city_id}/pillars/{pillar_id}/questions", "analyze_questions_of_city_pillar",
+        "analyze_questions_of_city_pillar", ("city_id", "pillar_id"),
+        "analyze_questions_city_{city_id}_pillar_{pillar_id}",
+        "City {city_id} pillar {pillar_id} questions analysis started successfully. Processing in background.",
+        "Analyze all questions of a particular pillar for a city",
+    ),
+    _AnalysisEndpoint(
+        "/analyze/{city_id}/single-pillar/{pillar_id}", "analyze_single_pillar",
+        "analyze_Single_Pillar", ("city_id", "pillar_id"),
+        "analyze single city{city_id}_pillar_{pillar_id}",
+        "City {city_id} pillar {pillar_id} analysis started successfully. Processing in background.",
+        "Analyze single pillar for a city",
+        required=("city_id", "pillar_id"),
+        required_detail="provide required parameter",
+    ),
+)
+
+
+def _make_handler(endpoint: _AnalysisEndpoint):
+    """Build the route function for one endpoint: validate, enqueue, reply 202"""
+    async def handler(**path_params: int):
+        if endpoint.required and not any(path_params[p] for p in endpoint.required):
+            raise HTTPException(status_code=400, detail=endpoint.required_detail)
+
         # Start analysis in background
-        asyncio.create_task(
-            run_analysis_task(
-                f"analyze single city{city_id}_pillar_{pillar_id}",
-                score_analyzer_service.analyze_Single_Pillar(city_id, pillar_id)
-            )
-        )
-        
-        return AnalysisResponse(
-            success=True,
-            message=f"City {city_id} pillar {pillar_id} analysis started successfully. Processing in background.",
+        args = [path_params[p] for p in endpoint.params]
+        task_name = endpoint.task_name.format(**path_params)
+        if not _enqueue(task_name, lambda: getattr(score_analyzer_service, endpoint.method)(*args)):
+            return _started("Analysis already in progress. Processing in background.")
+
+        return _started(endpoint.message.format(**path_params))
+
+    # FastAPI reads the path params from the signature, and the name and
+    # docstring become the OpenAPI operation id and description
+    handler.__signature__ = inspect.Signature(
+        [inspect.Parameter(p, inspect.Parameter.KEYWORD_ONLY, annotation=int) for p in endpoint.params]
+    )
+    handler.__name__ = endpoint.name
+    handler.__doc__ = f"{endpoint.doc}\nReturns immediately while analysis runs in background"
+    return handler
+
+
+@router.post("/analyze/full/stream")
+async def analyze_all_cities_full_stream():
+    """
+    Analyze all cities and stream progress as NDJSON, one line per city as it completes
+    Unlike /analyze/full the request stays open until every city is done
+    """
+    # The run is an ordinary queued job (worker cap, 429 when full, shared dedup
+    # key with /analyze/full); this request only subscribes to its results
+    updates: asyncio.Queue = asyncio.Queue()
+    if not _enqueue(
+        _ALL_CITIES_TASK, lambda: _feed_updates(updates, score_analyzer_service.iter_all_cities_analysis())
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="An all-cities analysis is already in progress.",
         )
-            
-    except HTTPException:
-        raise
-    except Exception as e:
-        error_msg = f"Error starting pillar analysis (City: {city_id}, Pillar: {pillar_id}): {str(e)}"
-        logger.error(error_msg, exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+
+    return StreamingResponse(
+        _ndjson_stream("analyze_all_cities_full_stream", _subscribe(updates)),
+        media_type="application/x-ndjson",
+    )
+
+
+for _endpoint in _ENDPOINTS:
+    router.add_api_route(
+        _endpoint.path,
+        _make_handler(_endpoint),
+        methods=["POST"],
+        name=_endpoint.name,
+        response_model=AnalysisResponse,
+        status_code=status.HTTP_202_ACCEPTED,
+    )
@@ -0,0 +1,70 @@
+"""
+Analysis Queue - Bounded job queue drained by a fixed pool of background workers
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional, Tuple
+
+from app.config import settings
+from app.services.common.task_manager import task_manager
+
+logger = logging.getLogger(__name__)
+
+# A job is a zero-argument factory; the coroutine is only created when a
+# worker picks it up, so a job that is never run never leaks a coroutine
+AnalysisJob = Callable[[], Awaitable[None]]
+
+
+class AnalysisQueue:
+    """Admits analysis jobs up to maxsize and runs at most `workers` of them at once"""
+
+    def __init__(self, maxsize: int, workers: int):
+        self.maxsize = maxsize
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+
+    def start(self):
+        """Create the queue and start the workers (called from the app lifespan)"""
+        if self._queue is not None:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        # Workers are tracked by the task manager, so its shutdown cancels them
+        for index in range(self.workers):
+            task_manager.create_task(self._worker(), name=f"analysis-worker-{index}")
+
+    def submit(self, name: str, job: AnalysisJob):
+        """
+        Queue a job without waiting
+
+        Raises:
+            asyncio.QueueFull: the queue is at capacity
+            RuntimeError: the workers have not been started
+        """
+        if self._queue is None:
+            raise RuntimeError("Analysis queue is not running")
+
+        self._queue.put_nowait((name, job))
+
+    @property
+    def pending_count(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self):
+        """Run queued jobs one after another until cancelled"""
+        while True:
+            item: Tuple[str, AnalysisJob] = await self._queue.get()
+            name, job = item
+            try:
+                await job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Analysis job '%s' failed: %s", name, e, exc_info=True)
+            finally:
+                self._queue.task_done()
+
+
+# Singleton instance
+analysis_queue = AnalysisQueue(settings.ANALYSIS_QUEUE_SIZE, settings.ANALYSIS_WORKERS)
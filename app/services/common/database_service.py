@@ -2,131 +2,272 @@
 Database Service: SQL Server connection and query execution
 """
 
+import re
+import math
+import time
+import asyncio
+import threading
 import pyodbc
 import pandas as pd
-from typing import List, Dict, Any,Optional
+from typing import List, Dict, Any,Optional, Set, Tuple
 from contextlib import contextmanager
 import logging
 from app.config import settings
 logger = logging.getLogger(__name__)
 
+# Column names accepted in generated SELECT lists (bracket-quoted on use)
+_COLUMN_RE = re.compile(r"^\w+$")
+
+# Hot queries live at module level so their text is byte-identical on every
+# call; with pooled connections SQL Server then reuses one cached plan each
+SCHEMA_INFO_QUERY = """
+    SELECT 
+        t.TABLE_NAME,
+        c.COLUMN_NAME,
+        c.DATA_TYPE,
+        c.IS_NULLABLE,
+        c.CHARACTER_MAXIMUM_LENGTH
+    FROM 
+        INFORMATION_SCHEMA.TABLES t
+    INNER JOIN 
+        INFORMATION_SCHEMA.COLUMNS c 
+        ON t.TABLE_NAME = c.TABLE_NAME
+    WHERE 
+        t.TABLE_TYPE = 'BASE TABLE'
+        AND t.TABLE_SCHEMA = 'dbo'
+    ORDER BY 
+        t.TABLE_NAME, c.ORDINAL_POSITION
+"""
+
+TABLE_SCHEMA_QUERY = """
+    SELECT 
+        COLUMN_NAME,
+        DATA_TYPE,
+        IS_NULLABLE,
+        CHARACTER_MAXIMUM_LENGTH,
+        COLUMN_DEFAULT
+    FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE TABLE_NAME = ?
+    ORDER BY ORDINAL_POSITION
+"""
+
+# Row-count estimate from partition metadata (no table scan)
+ROW_ESTIMATE_QUERY = """
+    SELECT SUM(p.rows)
+    FROM sys.partitions p
+    WHERE p.object_id = OBJECT_ID(?) AND p.index_id IN (0, 1)
+"""
+
+KNOWN_OBJECTS_QUERY = "SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = 'dbo'"
+
+# Let the ODBC driver manager pool connections: conn.close() hands the
+# connection back and the next connect() with the same string reuses it,
+# skipping the TCP handshake and TDS login. Must be set before the first connect.
+pyodbc.pooling = True
+
+
+def build_connect_kwargs(timeout: int) -> Dict[str, Any]:
+    """
+    Keyword arguments for pyodbc.connect, built once per service
+
+    Only numeric options belong here; the connection string itself stays
+    byte-identical across consumers because the ODBC pool is keyed on it.
+    """
+    return {"timeout": timeout, "autocommit": False}
+
+
+def build_connection_string() -> str:
+    """Build the SQL Server connection string shared by every DB consumer"""
+    # Option 1: Windows Authentication
+    if settings.DB_USE_WINDOWS_AUTH:
+        return (
+            f"DRIVER={{ODBC Driver 17 for SQL Server}};"
+            f"SERVER={settings.DB_SERVER};"
+            f"DATABASE={settings.DB_NAME};"
+            f"Trusted_Connection=yes;"
+        )
+    # Option 2: SQL Server Authentication
+    return (
+        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
+        f"SERVER={settings.DB_SERVER};"
+        f"DATABASE={settings.DB_NAME};"
+        f"UID={settings.DB_USERNAME};"
+        f"PWD={settings.DB_PASSWORD};"
+    )
+
 
 class DatabaseService:
+    # Schema metadata rarely changes, so INFORMATION_SCHEMA is re-read at most once a minute
+    SCHEMA_CACHE_TTL = 60  # seconds
+    # An unknown table name forces a table/view re-read at most this often,
+    # so a stream of bad names can't turn into one query per lookup
+    KNOWN_OBJECTS_REFRESH_INTERVAL = 5  # seconds
+    # Rows pulled from the driver per fetchmany() round-trip
+    FETCH_ARRAYSIZE = 5000
+    # Sampling reads whole tables (ORDER BY NEWID()) below this many rows,
+    # and TABLESAMPLE SYSTEM pages above it
+    SAMPLE_SCAN_MAX_ROWS = 10000
+
     def __init__(self):
         self.connection_string = None
         self._build_connection_string()
+        self._connect_kwargs = build_connect_kwargs(timeout=30)
+        self._schema_cache: Optional[Dict[str, List[Dict]]] = None
+        self._schema_cache_expiry = 0.0
+        self._schema_lock = asyncio.Lock()
+        # Table/view names that may be interpolated into generated SQL,
+        # loaded from INFORMATION_SCHEMA on first use
+        self._known_objects: Optional[Set[str]] = None
+        self._known_objects_loaded_at = 0.0
+        self._known_objects_lock = threading.Lock()
+        # Per-table column metadata: table name -> (expires_at, columns)
+        self._table_schema_cache: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._table_schema_lock = threading.Lock()
 
     def _build_connection_string(self):
         """Build SQL Server connection string"""
-        # Option 1: Windows Authentication
-        if settings.DB_USE_WINDOWS_AUTH:
-            self.connection_string = (
-                f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-                f"SERVER={settings.DB_SERVER};"
-                f"DATABASE={settings.DB_NAME};"
-                f"Trusted_Connection=yes;"
-            )
-        # Option 2: SQL Server Authentication
-        else:
-            self.connection_string = (
-                f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-                f"SERVER={settings.DB_SERVER};"
-                f"DATABASE={settings.DB_NAME};"
-                f"UID={settings.DB_USER};"
-                f"PWD={settings.DB_PASSWORD};"
-            )
+        self.connection_string = build_connection_string()
 
     @contextmanager
     def get_connection(self):
         """Context manager for database connections"""
         conn = None
         try:
-            conn = pyodbc.connect(self.connection_string, timeout=30)
+            conn = pyodbc.connect(self.connection_string, **self._connect_kwargs)
             yield conn
         except pyodbc.Error as e:
-            logger.error(f"Database connection error: {e}")
+            logger.error("Database connection error: %s", e)
             raise
         finally:
             if conn:
                 conn.close()
 
+    @staticmethod
+    def _exec(conn, query: str, params: tuple = None) -> pyodbc.Cursor:
+        """
+        Execute query (with bound parameters, if any) on a new cursor of conn
+
+        Values travel as parameters rather than SQL text, so each query shape
+        compiles once and later calls hit SQL Server's plan cache.
+        """
+        cursor = conn.cursor()
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        return cursor
+
+    def _read_df(self, conn, query: str, params: tuple = None) -> pd.DataFrame:
+        """
+        Run a query on conn and build a DataFrame straight from the fetched rows
+
+        Same result as pd.read_sql on a raw pyodbc connection, without its
+        per-call DBAPI fallback (and warning) in front of the same fetch.
+        """
+        cursor = self._exec(conn, query, params)
+        columns = [column[0] for column in cursor.description]
+        cursor.arraysize = self.FETCH_ARRAYSIZE
+        return self._to_frame(cursor.fetchall(), columns)
+
+    @staticmethod
+    def _to_frame(rows: list, columns: List[str]) -> pd.DataFrame:
+        """
+        Build a DataFrame from fetched rows
+
+        Stays on NumPy/object dtypes so itertuples() yields plain Python ints
+        and floats, which orjson, pyodbc params and math.isnan all accept
+        """
+        return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
     async def execute_query(
         self, query: str, params: tuple = None
     ) -> List[Dict[str, Any]]:
         """
         Execute SELECT query and return results as list of dicts
+
+        pyodbc is blocking, so the query runs in a worker thread and the event
+        loop keeps serving other requests meanwhile.
         """
+        return await asyncio.to_thread(self._execute_query_sync, query, params)
+
+    def _execute_query_sync(
+        self, query: str, params: tuple = None
+    ) -> List[Dict[str, Any]]:
+        """Blocking body of execute_query"""
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor()
-
-                if params:
-                    cursor.execute(query, params)
-                else:
-                    cursor.execute(query)
+                cursor = self._exec(conn, query, params)
 
                 # Get column names
                 columns = [column[0] for column in cursor.description]
 
-                # Fetch all rows
-                rows = cursor.fetchall()
-
-                # Convert to list of dicts
+                # Fetch in FETCH_ARRAYSIZE batches and convert each batch to dicts
+                cursor.arraysize = self.FETCH_ARRAYSIZE
                 results = []
-                for row in rows:
-                    results.append(dict(zip(columns, row)))
+                while True:
+                    rows = cursor.fetchmany()
+                    if not rows:
+                        break
+                    results.extend([dict(zip(columns, row)) for row in rows])
 
                 logger.info(
-                    f"Query executed successfully. Returned {len(results)} rows."
+                    "Query executed successfully. Returned %s rows.", len(results)
                 )
                 return results
 
         except pyodbc.Error as e:
-            logger.error(f"Query execution error: {e}")
+            logger.error("Query execution error: %s", e)
             raise Exception(f"Database query failed: {str(e)}")
 
     async def execute_query_df(self, query: str, params: tuple = None) -> pd.DataFrame:
         """
-        Execute query and return pandas DataFrame
+        Execute query and return pandas DataFrame (in a worker thread, like execute_query)
         """
+        return await asyncio.to_thread(self._execute_query_df_sync, query, params)
+
+    def _execute_query_df_sync(self, query: str, params: tuple = None) -> pd.DataFrame:
+        """Blocking body of execute_query_df"""
         try:
             with self.get_connection() as conn:
-                if params:
-                    df = pd.read_sql(query, conn, params=params)
-                else:
-                    df = pd.read_sql(query, conn)
+                df = self._read_df(conn, query, params)
 
-                logger.info(f"Query executed successfully. DataFrame shape: {df.shape}")
+                logger.info("Query executed successfully. DataFrame shape: %s", df.shape)
                 return df
 
         except Exception as e:
-            logger.error(f"Query execution error: {e}")
+            logger.error("Query execution error: %s", e)
             raise Exception(f"Database query failed: {str(e)}")
 
     async def get_schema_info(self) -> Dict[str, List[Dict]]:
         """
-        Get database schema information for all tables
-        """
-        schema_query = """
-            SELECT 
-                t.TABLE_NAME,
-                c.COLUMN_NAME,
-                c.DATA_TYPE,
-                c.IS_NULLABLE,
-                c.CHARACTER_MAXIMUM_LENGTH
-            FROM 
-                INFORMATION_SCHEMA.TABLES t
-            INNER JOIN 
-                INFORMATION_SCHEMA.COLUMNS c 
-                ON t.TABLE_NAME = c.TABLE_NAME
-            WHERE 
-                t.TABLE_TYPE = 'BASE TABLE'
-                AND t.TABLE_SCHEMA = 'dbo'
-            ORDER BY 
-                t.TABLE_NAME, c.ORDINAL_POSITION
-            """
-
-        results = await self.execute_query(schema_query)
+        Get database schema information for all tables (cached for SCHEMA_CACHE_TTL seconds)
+        """
+        if self._schema_cache is not None and time.monotonic() < self._schema_cache_expiry:
+            return self._schema_cache
+
+        async with self._schema_lock:
+            # Another caller may have refreshed the cache while we waited
+            if self._schema_cache is None or time.monotonic() >= self._schema_cache_expiry:
+                self._schema_cache = await self._load_schema_info()
+                self._schema_cache_expiry = time.monotonic() + self.SCHEMA_CACHE_TTL
+
+        return self._schema_cache
+
+    def invalidate_schema_cache(self):
+        """Drop cached schema metadata so the next call re-reads INFORMATION_SCHEMA"""
+        self._schema_cache = None
+        self._schema_cache_expiry = 0.0
+        with self._table_schema_lock:
+            self._table_schema_cache.clear()
+        with self._known_objects_lock:
+            self._known_objects = None
+            self._known_objects_loaded_at = 0.0
+
+    async def _load_schema_info(self) -> Dict[str, List[Dict]]:
+        """
+        Read database schema information for all tables from INFORMATION_SCHEMA
+        """
+        results = await self.execute_query(SCHEMA_INFO_QUERY)
 
         # Organize by table
         schema = {}
@@ -146,12 +287,43 @@ class DatabaseService:
 
         return schema
 
-    async def get_sample_data(self, table_name: str, limit: int = 3) -> List[Dict]:
+    def _load_known_objects(self, refresh: bool = False) -> Set[str]:
         """
-        Get sample data from a table
+        Read every dbo table and view name (cached for SCHEMA_CACHE_TTL seconds)
+
+        refresh re-reads a cached set older than KNOWN_OBJECTS_REFRESH_INTERVAL
+        """
+        with self._known_objects_lock:
+            max_age = self.KNOWN_OBJECTS_REFRESH_INTERVAL if refresh else self.SCHEMA_CACHE_TTL
+            if self._known_objects is None or time.monotonic() - self._known_objects_loaded_at >= max_age:
+                with self.get_connection() as conn:
+                    cursor = self._exec(conn, KNOWN_OBJECTS_QUERY)
+                    self._known_objects = {row[0].lower() for row in cursor.fetchall()}
+                self._known_objects_loaded_at = time.monotonic()
+            return self._known_objects
+
+    def _quote_object(self, name: str) -> str:
+        """
+        Validate a table/view name against the database and return it bracket-quoted
+
+        Raises:
+            ValueError: name is not an existing dbo table or view
         """
-        query = f"SELECT TOP {limit} * FROM [{table_name}]"
-        return await self.execute_query(query)
+        key = name.lower()
+        # On a miss re-read the names (rate limited), in case the object was created since the last load
+        if key not in self._load_known_objects() and key not in self._load_known_objects(refresh=True):
+            raise ValueError(f"Unknown table or view: {name!r}")
+        return f"[{name}]"
+
+    @staticmethod
+    def _quote_columns(columns: Optional[List[str]]) -> str:
+        """Bracket-quote a column list (None = all columns)"""
+        if not columns:
+            return "*"
+        for column in columns:
+            if not _COLUMN_RE.match(column):
+                raise ValueError(f"Invalid column name: {column!r}")
+        return ", ".join(f"[{column}]" for column in columns)
 
     def test_connection(self) -> bool:
         """Test database connection"""
@@ -163,7 +335,7 @@ class DatabaseService:
                 logger.info("✅ Database connection successful")
                 return True
         except Exception as e:
-            logger.error(f"❌ Database connection failed: {e}")
+            logger.error("❌ Database connection failed: %s", e)
             return False
     
     def read_table_data(
@@ -172,7 +344,9 @@ class DatabaseService:
         columns: Optional[List[str]] = None,
         where_clause: Optional[str] = None,
         limit: Optional[int] = None,
-        sample: bool = False
+        sample: bool = False,
+        params: Optional[tuple] = None,
+        seed: Optional[int] = None
     ) -> pd.DataFrame:
         """
         Read data from a table efficiently
@@ -180,71 +354,88 @@ class DatabaseService:
         Args:
             table_name: Name of the table to read
             columns: List of columns to select (None = all columns)
-            where_clause: WHERE clause filter (without WHERE keyword)
+            where_clause: WHERE clause filter (without WHERE keyword), using ? placeholders
             limit: Maximum number of rows to return
             sample: Use sampling for large datasets
+            params: Values bound to the ? placeholders in where_clause
+            seed: REPEATABLE seed so a sample can be reproduced (large tables only)
         
         Returns:
             DataFrame containing the data
         """
         try:
             # Build column selection
-            col_str = ", ".join(columns) if columns else "*"
+            table = self._quote_object(table_name)
+            col_str = self._quote_columns(columns)
+            params = tuple(params or ())
             
-            # Build query
+            # Build query; TOP takes a parameter so the query text (and its
+            # cached plan) stays the same whatever the limit
+            order_by = ""
             if sample and limit:
-                # Use TABLESAMPLE for efficient random sampling
-                query = f"""
-                    SELECT TOP {limit} {col_str}
-                    FROM {table_name} TABLESAMPLE ({limit} ROWS)
-                """
+                total_rows = self._estimate_row_count(table_name)
+                if total_rows <= self.SAMPLE_SCAN_MAX_ROWS:
+                    # Small table: a full shuffle is cheap and always fills the sample
+                    query = f"SELECT TOP (?) {col_str} FROM {table}"
+                    order_by = " ORDER BY NEWID()"
+                else:
+                    # TABLESAMPLE SYSTEM reads whole pages, so only about percent%
+                    # of the table is touched; aim for ~2x limit rows before TOP
+                    percent = min(100, max(1, math.ceil(200 * int(limit) / total_rows)))
+                    query = f"SELECT TOP (?) {col_str} FROM {table} TABLESAMPLE SYSTEM ({percent} PERCENT)"
+                    if seed is not None:
+                        query += f" REPEATABLE ({int(seed)})"
+                params = (int(limit),) + params
             elif limit:
-                query = f"SELECT TOP {limit} {col_str} FROM {table_name}"
+                query = f"SELECT TOP (?) {col_str} FROM {table}"
+                params = (int(limit),) + params
             else:
-                query = f"SELECT {col_str} FROM {table_name}"
+                query = f"SELECT {col_str} FROM {table}"
             
             # Add WHERE clause if provided
             if where_clause:
                 query += f" WHERE {where_clause}"
+            query += order_by
             
-            logger.info(f"Executing query: {query}")
+            logger.info("Executing query: %s", query)
             
             with self.get_connection() as conn:
-                df = pd.read_sql(query, conn)
+                df = self._read_df(conn, query, params)
             
-            logger.info(f"Retrieved {len(df)} rows from {table_name}")
+            logger.info("Retrieved %s rows from %s", len(df), table_name)
             return df
             
         except Exception as e:
-            logger.error(f"Error reading table {table_name}: {e}")
+            logger.error("Error reading table %s: %s", table_name, e)
             raise
     
-    def read_with_query(self, query: str) -> pd.DataFrame:
+    def read_with_query(self, query: str, params: Optional[tuple] = None) -> pd.DataFrame:
         """
         Execute a custom query and return results as DataFrame
         
         Args:
-            query: SQL query to execute
+            query: SQL query to execute, using ? placeholders for values
+            params: Values bound to the placeholders
         
         Returns:
             DataFrame containing the results
         """
         try:
-            logger.info(f"Executing custom query: {query[:200]}...")
+            logger.info("Executing custom query: %s...", query[:200])
             
             with self.get_connection() as conn:
-                df = pd.read_sql(query, conn)
+                df = self._read_df(conn, query, params)
             
-            logger.info(f"Query returned {len(df)} rows")
+            logger.info("Query returned %s rows", len(df))
             return df
             
         except Exception as e:
-            logger.error(f"Error executing query: {e}")
+            logger.error("Error executing query: %s", e)
             raise
     
     def get_table_schema(self, table_name: str) -> List[Dict[str, Any]]:
         """
-        Get schema information for a table
+        Get schema information for a table (cached for SCHEMA_CACHE_TTL seconds)
         
         Args:
             table_name: Name of the table
@@ -252,53 +443,61 @@ class DatabaseService:
         Returns:
             List of column information dictionaries
         """
-        query = f"""
-            SELECT 
-                COLUMN_NAME,
-                DATA_TYPE,
-                IS_NULLABLE,
-                CHARACTER_MAXIMUM_LENGTH,
-                COLUMN_DEFAULT
-            FROM INFORMATION_SCHEMA.COLUMNS
-            WHERE TABLE_NAME = '{table_name}'
-            ORDER BY ORDINAL_POSITION
-        """
-        
+        key = table_name.lower()
+        with self._table_schema_lock:
+            entry = self._table_schema_cache.get(key)
+            if entry is not None and time.monotonic() < entry[0]:
+                return [dict(column) for column in entry[1]]
+
         try:
             with self.get_connection() as conn:
-                df = pd.read_sql(query, conn)
+                df = self._read_df(conn, TABLE_SCHEMA_QUERY, (table_name,))
             
-            return df.to_dict('records')
+            columns = df.to_dict('records')
+            with self._table_schema_lock:
+                self._table_schema_cache[key] = (time.monotonic() + self.SCHEMA_CACHE_TTL, columns)
+            return [dict(column) for column in columns]
             
         except Exception as e:
-            logger.error(f"Error getting schema for {table_name}: {e}")
+            logger.error("Error getting schema for %s: %s", table_name, e)
             raise
     
-    def get_row_count(self, table_name: str, where_clause: Optional[str] = None) -> int:
+    def _estimate_row_count(self, table_name: str) -> int:
+        """Approximate row count from sys.partitions (metadata only, no scan)"""
+        with self.get_connection() as conn:
+            result = self._exec(conn, ROW_ESTIMATE_QUERY, (f"dbo.{table_name}",)).fetchone()
+        return int(result[0]) if result and result[0] is not None else 0
+
+    def get_row_count(
+        self,
+        table_name: str,
+        where_clause: Optional[str] = None,
+        params: Optional[tuple] = None
+    ) -> int:
         """
         Get row count for a table efficiently
         
         Args:
             table_name: Name of the table
-            where_clause: Optional WHERE clause filter
+            where_clause: Optional WHERE clause filter, using ? placeholders
+            params: Values bound to the ? placeholders in where_clause
         
         Returns:
             Number of rows
         """
-        query = f"SELECT COUNT(*) as cnt FROM {table_name}"
+        query = f"SELECT COUNT(*) as cnt FROM {self._quote_object(table_name)}"
         
         if where_clause:
             query += f" WHERE {where_clause}"
         
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query)
+                cursor = self._exec(conn, query, params)
                 result = cursor.fetchone()
                 return result[0] if result else 0
                 
         except Exception as e:
-            logger.error(f"Error getting row count: {e}")
+            logger.error("Error getting row count: %s", e)
             raise
     
     def read_data_in_chunks(self, table_name: str, chunk_size: int = 1000,columns: Optional[List[str]] = None):
@@ -313,16 +512,21 @@ class DatabaseService:
         Yields:
             DataFrame chunks
         """
-        col_str = ", ".join(columns) if columns else "*"
-        query = f"SELECT {col_str} FROM {table_name}"
+        col_str = self._quote_columns(columns)
+        query = f"SELECT {col_str} FROM {self._quote_object(table_name)}"
         
         try:
             with self.get_connection() as conn:
-                for chunk_df in pd.read_sql(query, conn, chunksize=chunk_size):
-                    yield chunk_df
+                cursor = self._exec(conn, query)
+                columns = [column[0] for column in cursor.description]
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield self._to_frame(rows, columns)
                     
         except Exception as e:
-            logger.error(f"Error reading chunks from {table_name}: {e}")
+            logger.error("Error reading chunks from %s: %s", table_name, e)
             raise
     
     def get_sample_data(
@@ -349,39 +553,47 @@ class DatabaseService:
             sample=True
         )
     
-    def get_view_data(self,view_name: str,where: Optional[str] = None,limit: Optional[int] = None ) -> pd.DataFrame:
+    def get_view_data(
+        self,
+        view_name: str,
+        where: Optional[str] = None,
+        limit: Optional[int] = None,
+        params: Optional[tuple] = None
+    ) -> pd.DataFrame:
         """
         Execute a SQL view with optional WHERE and LIMIT/TOP.
 
         Args:
             view_name: Name of the SQL view
-            where: SQL WHERE condition (e.g., "status = 'Active'")
+            where: SQL WHERE condition with ? placeholders (e.g., "cityId = ?")
             limit: Max rows to return
+            params: Values bound to the ? placeholders in where
 
         Returns:
             DataFrame containing the result
         """
+        params = tuple(params or ())
 
-        # Base query
-        query = f"SELECT * FROM {view_name}"
+        # Base query (TOP is a parameter too, so one plan serves every limit)
+        view = self._quote_object(view_name)
+        if limit:
+            query = f"SELECT TOP (?) * FROM {view}"
+            params = (int(limit),) + params
+        else:
+            query = f"SELECT * FROM {view}"
 
         # Add WHERE clause
         if where:
             query += f" WHERE {where}"
 
-        # Add TOP clause (for SQL Server)
-        if limit:
-            # Insert TOP n after SELECT
-            query = query.replace("SELECT", f"SELECT TOP {limit}", 1)
-
         try:
             with self.get_connection() as conn:
-                df = pd.read_sql(query, conn)
+                df = self._read_df(conn, query, params)
 
             return df
 
         except Exception as e:
-            logger.error(f"Error executing view '{view_name}': {e}")
+            logger.error("Error executing view '%s': %s", view_name, e)
             raise
 
     def bulk_upsert_question_evaluations(self, rows: list[dict]):
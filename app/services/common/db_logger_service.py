@@ -1,33 +1,185 @@
 """
 Database Logger Service - Logs exceptions and messages to database
 """
+import sys
+import time
+import queue
+import asyncio
 import logging
+import threading
 import traceback
 from datetime import datetime
-from typing import Optional
+from typing import Callable, List, Optional, Tuple
 import pyodbc
 from contextlib import contextmanager
 
-from app.config import settings
+from app.services.common.database_service import build_connect_kwargs, build_connection_string
+
+
+LogRow = Tuple[str, str, Optional[str], datetime]
+
+# Shared by both AppLogs writers (the logging handler's flusher thread and the
+# log_message/log_exception writer task): queued rows are flushed every
+# FLUSH_INTERVAL seconds or BATCH_SIZE rows, whichever comes first
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.25  # seconds
+QUEUE_MAXSIZE = 10000
+CONNECT_TIMEOUT = 10  # seconds
+
+_INSERT_QUERY = """
+    INSERT INTO AppLogs (Level, Message, Exception, CreatedAt)
+    VALUES (?, ?, ?, ?)
+"""
+
+
+class _WriteBreaker:
+    """
+    Circuit breaker for AppLogs writes
+
+    After a failed write, further writes are skipped for min(2**failures,
+    MAX_BACKOFF) seconds so an unreachable SQL Server costs one connect
+    timeout per window instead of one per log record.
+    """
+
+    MAX_BACKOFF = 300  # seconds
+
+    def __init__(self):
+        self._failures = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        return time.monotonic() >= self._retry_at
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._retry_at = 0.0
+
+    def record_failure(self) -> float:
+        """Open the breaker and return the backoff in seconds"""
+        with self._lock:
+            self._failures += 1
+            backoff = min(2 ** self._failures, self.MAX_BACKOFF)
+            self._retry_at = time.monotonic() + backoff
+            return backoff
+
+
+class _TokenBucket:
+    """Allows `rate` events per second on average, in bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> Tuple[bool, int]:
+        """Take a token; returns (allowed, events dropped since the last allowed one)"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                self._dropped += 1
+                return False, 0
+            self._tokens -= 1
+            dropped, self._dropped = self._dropped, 0
+            return True, dropped
+
+
+# Shared by every stderr fallback in this module, so a DB outage can't turn
+# each log record into console I/O on the request path
+_stderr_bucket = _TokenBucket(rate=5, burst=20)
+
+
+def _stderr(message: str):
+    """Write a fallback line to stderr, rate limited by _stderr_bucket"""
+    allowed, dropped = _stderr_bucket.allow()
+    if not allowed:
+        return
+    if dropped:
+        message = f"[{dropped} log lines suppressed] {message}"
+    sys.stderr.write(message + "\n")
+
+
+def _write_to_stderr(rows: List[LogRow]):
+    """Fallback sink while AppLogs is unreachable"""
+    for level, message, exception, created_at in rows:
+        line = f"{created_at:%Y-%m-%d %H:%M:%S} {level} {message}"
+        _stderr(f"{line}\n{exception.rstrip()}" if exception else line)
+
+
+def _insert_log_rows(
+    rows: List[LogRow],
+    get_connection: Callable,
+    ensure_table: Optional[Callable[[], None]],
+    breaker: _WriteBreaker,
+):
+    """Insert log rows into AppLogs in one round-trip (stderr while the breaker is open)"""
+    if not breaker.allow():
+        _write_to_stderr(rows)
+        return
+
+    try:
+        if ensure_table:
+            ensure_table()
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.fast_executemany = True
+            cursor.executemany(_INSERT_QUERY, rows)
+            conn.commit()
+        breaker.record_success()
+    except Exception as e:
+        backoff = breaker.record_failure()
+        _stderr(f"Error inserting {len(rows)} log rows, pausing DB logging for {backoff}s: {e}")
+        _write_to_stderr(rows)
 
 
 class DatabaseLogHandler(logging.Handler):
-    """Custom logging handler that writes to database"""
+    """
+    Custom logging handler that writes to database
 
-    def __init__(self, connection_string: str):
+    emit() only queues the record; a daemon flusher thread formats queued
+    records and inserts them in batches of up to BATCH_SIZE, waiting at most
+    FLUSH_INTERVAL for a batch to fill.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        connection_string: str,
+        ensure_table: Optional[Callable[[], None]] = None,
+        breaker: Optional[_WriteBreaker] = None,
+    ):
         super().__init__()
         self.connection_string = connection_string
+        self._connect_kwargs = build_connect_kwargs(timeout=CONNECT_TIMEOUT)
+        self._ensure_table = ensure_table
+        self._breaker = breaker or _WriteBreaker()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=QUEUE_MAXSIZE)
+        self._flusher = threading.Thread(target=self._flush_loop, name="db-log-flusher", daemon=True)
+        self._flusher.start()
+        # Anything logged while the flusher itself is writing (a driver or
+        # connect error) must not be fed back into the queue it is draining
+        self.addFilter(self._not_from_flusher)
+
+    def _not_from_flusher(self, record: logging.LogRecord) -> bool:
+        return record.thread != self._flusher.ident
 
     @contextmanager
     def get_connection(self):
         """Context manager for database connections"""
         conn = None
         try:
-            conn = pyodbc.connect(self.connection_string, timeout=10)
+            conn = pyodbc.connect(self.connection_string, **self._connect_kwargs)
             yield conn
         except pyodbc.Error as e:
             # Fallback to console if DB connection fails
-            print(f"Database logging connection error: {e}")
+            _stderr(f"Database logging connection error: {e}")
             raise
         finally:
             if conn:
@@ -35,71 +187,109 @@ class DatabaseLogHandler(logging.Handler):
 
     def emit(self, record: logging.LogRecord):
         """
-        Write log record to database
+        Queue log record for the database flusher
         """
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            _stderr(f"Database log queue full, dropping log record: {record.getMessage()}")
+
+    def _to_row(self, record: logging.LogRecord) -> Optional[LogRow]:
+        """Format a queued record into an AppLogs row (runs on the flusher thread)"""
         try:
             # Format the exception if present
             exception_text = None
             if record.exc_info:
                 exception_text = ''.join(traceback.format_exception(*record.exc_info))
 
-            # Prepare log data
-            level = record.levelname
+            level = 'AI_' + record.levelname
             message = self.format(record)
             created_at = datetime.fromtimestamp(record.created)
-
-            # Insert into database
-            self._insert_log(level, message, exception_text, created_at)
-
+            return level, message, exception_text, created_at
         except Exception as e:
             # Don't let logging errors break the application
-            print(f"Failed to write log to database: {e}")
-            self.handleError(record)
+            _stderr(f"Failed to format log record for database: {e}")
+            return None
 
-    def _insert_log(self, level: str, message: str, exception: Optional[str], created_at: datetime):
-        """Insert log entry into AppLogs table"""
-        level='AI_'+level
-        query = """
-            INSERT INTO AppLogs (Level, Message, Exception, CreatedAt)
-            VALUES (?, ?, ?, ?)
-        """
-        
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, (level, message, exception, created_at))
-                conn.commit()
-        except Exception as e:
-            print(f"Error inserting log: {e}")
+    def _flush_loop(self):
+        """Collect queued records into batches and insert each batch in one round-trip"""
+        while True:
+            record = self._queue.get()
+            if record is self._STOP:
+                return
+
+            batch = [record]
+            stopping = False
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    record = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if record is self._STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+
+            rows = [row for row in map(self._to_row, batch) if row is not None]
+            if rows:
+                self._insert_logs(rows)
+            if stopping:
+                return
+
+    def _insert_logs(self, rows: List[LogRow]):
+        """Insert log entries into AppLogs table"""
+        _insert_log_rows(rows, self.get_connection, self._ensure_table, self._breaker)
+
+    def close(self):
+        """Flush queued rows and stop the flusher (logging.shutdown calls this at exit)"""
+        if self._flusher.is_alive():
+            self._queue.put(self._STOP)
+            self._flusher.join(timeout=10)
+        super().close()
 
 
 class DatabaseLoggerService:
     """Service for logging to database"""
 
+    LOG_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+
     def __init__(self):
         self.connection_string = self._build_connection_string()
-        self._ensure_table_exists()
+        self._connect_kwargs = build_connect_kwargs(timeout=CONNECT_TIMEOUT)
+        # AppLogs is created from the app lifespan (ensure_table_exists); writes
+        # only retry the DDL if that didn't succeed, so importing this module
+        # (and therefore the app) never blocks on a SQL Server connect
+        self._table_checked = False
+        self._table_lock = threading.Lock()
+        # Shared by every AppLogs writer: one outage opens it for all of them
+        self._breaker = _WriteBreaker()
+        # Background writer (started from the app lifespan)
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Python logging: one DatabaseLogHandler shared by every logger
+        self._log_handler: Optional[DatabaseLogHandler] = None
 
     def _build_connection_string(self) -> str:
-        """Build SQL Server connection string"""
-        if settings.DB_USE_WINDOWS_AUTH:
-            return (
-                f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-                f"SERVER={settings.DB_SERVER};"
-                f"DATABASE={settings.DB_NAME};"
-                f"Trusted_Connection=yes;"
-            )
-        else:
-            return (
-                f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-                f"SERVER={settings.DB_SERVER};"
-                f"DATABASE={settings.DB_NAME};"
-                f"UID={settings.DB_USER};"
-                f"PWD={settings.DB_PASSWORD};"
-            )
+        """Build SQL Server connection string (same string, so the same ODBC pool)"""
+        return build_connection_string()
+
+    def ensure_table_exists(self):
+        """Create AppLogs table if it doesn't exist (idempotent; no-op once it succeeded)"""
+        if self._table_checked:
+            return
+
+        with self._table_lock:
+            if self._table_checked:
+                return
+            self._table_checked = self._create_table()
 
-    def _ensure_table_exists(self):
-        """Create AppLogs table if it doesn't exist"""
+    def _create_table(self) -> bool:
+        """Run the AppLogs DDL"""
         create_table_query = """
         IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='AppLogs' AND xtype='U')
         CREATE TABLE AppLogs (
@@ -116,23 +306,94 @@ class DatabaseLoggerService:
                 cursor = conn.cursor()
                 cursor.execute(create_table_query)
                 conn.commit()
+            return True
         except Exception as e:
-            print(f"Warning: Could not ensure AppLogs table exists: {e}")
+            _stderr(f"Warning: Could not ensure AppLogs table exists: {e}")
+            return False
 
     @contextmanager
     def get_connection(self):
         """Context manager for database connections"""
         conn = None
         try:
-            conn = pyodbc.connect(self.connection_string, timeout=10)
+            conn = pyodbc.connect(self.connection_string, **self._connect_kwargs)
             yield conn
         except pyodbc.Error as e:
-            print(f"Database connection error: {e}")
+            _stderr(f"Database connection error: {e}")
             raise
         finally:
             if conn:
                 conn.close()
 
+    async def start_writer(self):
+        """Start the background task that batches queued log rows into AppLogs"""
+        if self._writer_task is not None:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=QUEUE_MAXSIZE)
+        self._writer_task = asyncio.create_task(self._drain())
+
+    async def stop_writer(self):
+        """Flush pending log rows and stop the background writer"""
+        if self._writer_task is None:
+            return
+
+        # None is the shutdown sentinel; wait for the queue to be drained
+        await self._queue.put(None)
+        await self._writer_task
+        self._writer_task = None
+        self._queue = None
+        self._loop = None
+
+    async def _drain(self):
+        """Collect queued rows into batches and write each batch in a worker thread"""
+        while True:
+            row = await self._queue.get()
+            if row is None:
+                return
+
+            batch = [row]
+            stopping = False
+            deadline = self._loop.time() + FLUSH_INTERVAL
+            while len(batch) < BATCH_SIZE:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+
+            await asyncio.to_thread(self._write_rows, batch)
+            if stopping:
+                return
+
+    def _write_rows(self, rows: List[LogRow]):
+        """Insert log rows into AppLogs"""
+        _insert_log_rows(rows, self.get_connection, self.ensure_table_exists, self._breaker)
+
+    def _enqueue(self, row: LogRow):
+        """Hand a row to the background writer, or write it directly if not running"""
+        if self._queue is not None:
+            try:
+                running_loop = asyncio.get_running_loop()
+            except RuntimeError:
+                running_loop = None
+
+            if running_loop is self._loop:
+                try:
+                    self._queue.put_nowait(row)
+                except asyncio.QueueFull:
+                    _stderr(f"Log queue full, dropping log message: {row[1]}")
+                return
+
+        self._write_rows([row])
+
     def log_exception(self, level: str, message: str, exception: Exception):
         """
         Log an exception to the database
@@ -146,19 +407,7 @@ class DatabaseLoggerService:
         exception_text = ''.join(traceback.format_exception(
             type(exception), exception, exception.__traceback__
         ))
-        
-        query = """
-            INSERT INTO AppLogs (Level, Message, Exception, CreatedAt)
-            VALUES (?, ?, ?, GETDATE())
-        """
-        
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, (level, message, exception_text))
-                conn.commit()
-        except Exception as e:
-            print(f"Failed to log exception to database: {e}")
+        self._enqueue((level, message, exception_text, datetime.now()))
 
     def log_message(self, level: str, message: str):
         """
@@ -169,22 +418,31 @@ class DatabaseLoggerService:
             message: Log message
         """
         level='AI_'+level
-        query = """
-            INSERT INTO AppLogs (Level, Message, CreatedAt)
-            VALUES (?, ?, GETDATE())
-        """
-        
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, (level, message))
-                conn.commit()
-        except Exception as e:
-            print(f"Failed to log message to database: {e}")
+        self._enqueue((level, message, None, datetime.now()))
 
     def get_handler(self) -> DatabaseLogHandler:
-        """Get a logging handler for Python's logging framework"""
-        return DatabaseLogHandler(self.connection_string)
+        """
+        Get a logging handler for Python's logging framework
+
+        The handler only enqueues the record; formatting, traceback rendering
+        and the batched AppLogs insert all happen on its flusher thread, which
+        starts with the first call.
+        """
+        if self._log_handler is None:
+            self._log_handler = DatabaseLogHandler(
+                self.connection_string, self.ensure_table_exists, self._breaker
+            )
+            self._log_handler.setFormatter(logging.Formatter(self.LOG_FORMAT))
+
+        return self._log_handler
+
+    def stop_log_handler(self):
+        """Flush queued records and stop the handler's flusher thread"""
+        if self._log_handler is None:
+            return
+
+        self._log_handler.close()
+        self._log_handler = None
 
 
 # Singleton instance
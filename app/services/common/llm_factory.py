@@ -1,15 +1,53 @@
 """
 LLM Provider Factory - Abstract factory pattern for multiple LLM providers
 """
+import asyncio
 import logging
+import importlib.util
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
+import httpx
 from langchain_core.language_models import BaseChatModel
 from langchain_openai import ChatOpenAI
 from app.config import settings, LLMProvider
 
 logger = logging.getLogger(__name__)
 
+# One pooled HTTP client shared by every ChatOpenAI instance so LLM calls
+# reuse TCP/TLS connections instead of each model owning its own pool
+_http_async_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_async_client() -> httpx.AsyncClient:
+    """Get (or lazily create) the shared async HTTP client for LLM calls"""
+    global _http_async_client
+    if _http_async_client is None or _http_async_client.is_closed:
+        http2 = settings.LLM_HTTP2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("LLM_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+            http2 = False
+
+        _http_async_client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=200,
+                max_keepalive_connections=32,
+                keepalive_expiry=30,
+            ),
+            timeout=httpx.Timeout(600.0, connect=5.0),
+        )
+    return _http_async_client
+
+
+async def close_http_clients():
+    """Close the shared HTTP client (called on application shutdown)"""
+    global _http_async_client
+    if _http_async_client is not None:
+        await _http_async_client.aclose()
+        _http_async_client = None
+    # Cached models hold the closed client, so they must be rebuilt too
+    LLMFactory.clear_cache()
+
 
 class LLMProviderInterface(ABC):
     """Abstract interface for LLM providers"""
@@ -35,13 +73,14 @@ class OpenAIProvider(LLMProviderInterface):
         temperature = kwargs.get("temperature", settings.OPENAI_TEMPERATURE)
         max_tokens = kwargs.get("max_tokens", settings.LLM_MAX_TOKENS)
         
-        logger.info(f"Initializing OpenAI with model: {model}")
+        logger.info("Initializing OpenAI with model: %s", model)
         
         return ChatOpenAI(
             api_key=settings.OPENAI_API_KEY,
             model=model,
             temperature=temperature,
             max_tokens=max_tokens,
+            http_async_client=get_http_async_client(),
         )
     
     def get_model_name(self) -> str:
@@ -50,6 +89,12 @@ class OpenAIProvider(LLMProviderInterface):
 class OpenRouterProvider(LLMProviderInterface):
     """OpenRouter LLM Provider (uses OpenAI-compatible API)"""
     
+    # Settings are frozen at import, so the attribution headers are built once
+    _DEFAULT_HEADERS = {
+        "HTTP-Referer": settings.OPENROUTER_REFERER,
+        "X-Title": settings.OPENROUTER_APP_TITLE,
+    }
+    
     def get_llm(self, **kwargs) -> BaseChatModel:
         if not settings.OPENROUTER_API_KEY:
             raise ValueError("OPENROUTER_API_KEY not configured")
@@ -57,8 +102,9 @@ class OpenRouterProvider(LLMProviderInterface):
         model = kwargs.get("model", settings.OPENROUTER_MODEL)
         temperature = kwargs.get("temperature", settings.LLM_TEMPERATURE)
         max_tokens = kwargs.get("max_tokens", settings.LLM_MAX_TOKENS)
+        prompt_cache = kwargs.get("enable_prompt_cache", settings.OPENROUTER_PROMPT_CACHE)
         
-        logger.info(f"Initializing OpenRouter with model: {model}")
+        logger.info("Initializing OpenRouter with model: %s", model)
         
         return ChatOpenAI(
             api_key=settings.OPENROUTER_API_KEY,
@@ -66,10 +112,10 @@ class OpenRouterProvider(LLMProviderInterface):
             model=model,
             temperature=temperature,
             max_tokens=max_tokens,
-            default_headers={
-                "HTTP-Referer": "http://localhost:8000",
-                "X-Title": "AI Microservice"
-            }
+            http_async_client=get_http_async_client(),
+            # Research system prompts are a static multi-KB prefix, so cached reads are cheap
+            extra_body={"cache_control": {"type": "ephemeral"}} if prompt_cache else None,
+            default_headers=self._DEFAULT_HEADERS,
         )
     
     def get_model_name(self) -> str:
@@ -78,10 +124,15 @@ class OpenRouterProvider(LLMProviderInterface):
 class LLMFactory:
     """Factory class to create LLM instances based on configuration"""
     
+    # Providers are stateless, so one instance of each is shared
     _providers = {
-        LLMProvider.OPENAI: OpenAIProvider,
-        LLMProvider.OPENROUTER: OpenRouterProvider,
+        LLMProvider.OPENAI: OpenAIProvider(),
+        LLMProvider.OPENROUTER: OpenRouterProvider(),
     }
+    # Seconds to wait for the startup warmup request
+    WARMUP_TIMEOUT = 10
+    # Models already built, keyed by provider and the kwargs they were built with
+    _llm_cache: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], BaseChatModel] = {}
     
     @classmethod
     def create_llm(cls, provider: Optional[str] = None, **kwargs) -> BaseChatModel:
@@ -96,31 +147,61 @@ class LLMFactory:
             BaseChatModel: Configured LLM instance
         """
         provider_name = provider or settings.LLM_PROVIDER
+        key = provider_name.lower()
         
-        try:
-            provider_enum = LLMProvider(provider_name.lower())
-        except ValueError:
+        # LLMProvider is a str enum, so the raw name finds its member's entry directly
+        provider_instance = cls._providers.get(key)
+        if provider_instance is None:
             raise ValueError(
                 f"Unsupported LLM provider: {provider_name}. "
-                f"Supported providers: {[p.value for p in LLMProvider]}"
+                f"Supported providers: {[p.value for p in cls._providers]}"
             )
         
-        provider_class = cls._providers.get(provider_enum)
-        if not provider_class:
-            raise ValueError(f"Provider {provider_name} not implemented")
+        cache_key = (key, tuple(sorted(kwargs.items())))
+        try:
+            llm = cls._llm_cache.get(cache_key)
+        except TypeError:
+            # Unhashable kwargs can't be cached; build a model just for this call
+            return provider_instance.get_llm(**kwargs)
         
-        provider_instance = provider_class()
-        return provider_instance.get_llm(**kwargs)
+        if llm is None:
+            llm = provider_instance.get_llm(**kwargs)
+            cls._llm_cache[cache_key] = llm
+        return llm
+    
+    @classmethod
+    async def warmup(cls, llm: Optional[BaseChatModel] = None):
+        """
+        Open a pooled connection to the provider ahead of the first LLM call
+        
+        Lists the provider's models (no tokens billed) through the model's own
+        client, so DNS, TCP and TLS setup land in the shared keep-alive pool.
+        Failures are logged and ignored; the first real call just pays the cost.
+        """
+        llm = llm or cls.create_llm()
+        client = getattr(llm, "root_async_client", None)
+        if client is None:
+            return
+        
+        try:
+            await asyncio.wait_for(
+                client.with_options(max_retries=0).models.list(), timeout=cls.WARMUP_TIMEOUT
+            )
+            logger.info("LLM connection warmed up")
+        except Exception as e:
+            logger.warning("LLM connection warmup failed: %s", e)
+    
+    @classmethod
+    def clear_cache(cls):
+        """Drop every cached model so the next create_llm builds a fresh one"""
+        cls._llm_cache.clear()
     
     @classmethod
     def get_current_provider_name(cls) -> str:
         """Get the name of the current LLM provider"""
-        provider_name = settings.LLM_PROVIDER.lower()
-        provider_enum = LLMProvider(provider_name)
-        provider_class = cls._providers.get(provider_enum)
+        provider_instance = cls._providers.get(settings.LLM_PROVIDER.lower())
         
-        if provider_class:
-            provider_instance = provider_class()
+        if provider_instance:
             return provider_instance.get_model_name()
         
         return "Unknown"
@@ -0,0 +1,79 @@
+"""
+Research Cache - In-process TTL cache for AI research results
+"""
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import settings
+
+
+class ResearchCache:
+    """Bounded LRU cache with per-entry expiry for successful research results"""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Mixed into every key so results cached under old prompts never match
+        self._salt = ""
+
+    def set_salt(self, *parts: Any):
+        """Version the keys by the prompt text; changing any part orphans old entries"""
+        raw = "\x1f".join(str(p) for p in parts)
+        self._salt = hashlib.blake2b(raw.encode("utf-8"), digest_size=4).hexdigest()
+
+    def make_key(self, kind: str, *parts: Any) -> str:
+        """Build a compact cache key from every input that shapes the prompt"""
+        raw = "|".join("" if p is None else str(p) for p in parts)
+        digest = hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+        return f"vr:{kind}:{self._salt}:{digest}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result, or None if missing/expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return dict(value)
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int):
+        """Store a result for ttl seconds, evicting the least recently used entry"""
+        if ttl <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, dict(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def run_once(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run factory() for key unless a call for the same key is already in flight,
+        in which case wait for that call's result instead of starting another
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shield so one waiter being cancelled doesn't cancel the shared call
+        result = await asyncio.shield(task)
+        return dict(result) if isinstance(result, dict) else result
+
+    def clear(self):
+        """Drop every cached result"""
+        self._entries.clear()
+
+
+# Singleton instance
+research_cache = ResearchCache(settings.RESEARCH_CACHE_MAX_ENTRIES)
@@ -0,0 +1,44 @@
+"""
+Background Task Manager - Tracks fire-and-forget tasks and cancels them on shutdown
+"""
+import asyncio
+import logging
+from typing import Coroutine, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTaskManager:
+    """Keeps background tasks referenced until done and drains them at shutdown"""
+
+    def __init__(self):
+        # A strong set (not a WeakSet): the event loop only holds weak
+        # references, so this set is what keeps running tasks alive
+        self._tasks: Set[asyncio.Task] = set()
+
+    def create_task(self, coro: Coroutine, name: Optional[str] = None) -> asyncio.Task:
+        """Schedule a coroutine and track it until it finishes"""
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    @property
+    def active_count(self) -> int:
+        """Number of tasks still running"""
+        return len(self._tasks)
+
+    async def shutdown(self):
+        """Cancel every running task and wait for them to unwind"""
+        if not self._tasks:
+            return
+
+        tasks = list(self._tasks)
+        logger.info("Cancelling %s background task(s)...", len(tasks))
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Singleton instance
+task_manager = BackgroundTaskManager()
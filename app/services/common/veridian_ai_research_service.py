@@ -2,51 +2,240 @@
     Veridian Urban Index AI Research Service
     Independent research-based scoring with evidence tracking
 """
-import re
 import json
 import asyncio
 import logging
+import orjson
+import tiktoken
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from app.config import settings
 from app.services.common.llm_factory import llm_factory
 from app.services.common.pillar_prompts import PillarPrompts
+from app.services.common.research_cache import research_cache
 
 logger = logging.getLogger(__name__)
 
+# Built once: maps typographic dashes/ellipsis to ASCII and deletes the
+# control characters (everything below 0x20 except \t, \n, \r, plus DEL)
+_JSON_CLEAN_TABLE = str.maketrans({
+    "\u2013": "-",
+    "\u2014": "-",
+    "\u2026": "...",
+    **{chr(c): None for c in (*range(0x00, 0x09), 0x0b, 0x0c, *range(0x0e, 0x20), 0x7f)},
+})
+
+# Shared decoder for raw_decode (parses one object and ignores trailing text)
+_JSON_DECODER = json.JSONDecoder()
+
+# Per-call context of the research prompts. The _get_*_system_prompt rules hold
+# no placeholders, so they form a byte-identical prefix the provider can cache;
+# everything that varies per city/pillar/question follows in these messages
+_QUESTION_CONTEXT_PROMPT = """**PILLAR-SPECIFIC CONTEXT**:
+                {pillar_context}
+
+                **EVALUATOR CONTEXT** (if provided):
+                Human evaluator scored this as: {evaluator_score} and scoreProgress: {scoreProgress}%.
+                Use this as context but conduct INDEPENDENT research. Your score may differ based on evidence.
+
+                **RESEARCH NOW for**: {city_name} {city_address}
+                Question: {question_text}
+                Pillar: {pillar_name}"""
+
+_QUESTION_BATCH_CONTEXT_PROMPT = """**PILLAR-SPECIFIC CONTEXT**:
+                {pillar_context}
+
+                **EVALUATOR CONTEXT**: each question in the user message carries its own human evaluator score, if one was given.
+                Use it as context but conduct INDEPENDENT research. Your scores may differ based on evidence.
+
+                **RESEARCH NOW for**: {city_name} {city_address}
+                Pillar: {pillar_name}"""
+
+_PILLAR_CONTEXT_PROMPT = """**CONTEXT PROVIDED:**
+
+                        **Pillar Focus Areas:**
+                        {pillar_context}
+
+                        **Reference Scores (for context only - DO NOT copy these):**
+                        {evaluator_context}
+                        {ai_input_context}"""
+
+_CITY_CONTEXT_PROMPT = """**PILLAR SYNTHESIS CONTEXT**:
+            {pillars_context}
+
+            **REFERENCE SCORES** (for calibration only — do not copy):
+            {evaluator_context}
+            Previous AI Assessment: {aIScore}
+
+            **RESEARCH NOW for**: {city_name} {city_address}"""
+
+# User turns of the research prompts; templates and chains are built once, not per call
+_QUESTION_USER_PROMPT = """Conduct independent research and provide evidence-based scoring.
+                     
+                    City: {city_name}
+                    Address: {city_address}
+                    Question: {question_text}
+                    Pillar: {pillar_name}
+                    Year: {year}
+                    {evaluator_context}
+
+                    SEARCH THE WEB for verifiable evidence and provide your assessment.
+                    
+                    Remember: Return ONLY a single JSON object with the EXACT structure specified. Report details for only the MOST TRUSTWORTHY source."""
+
+_QUESTION_BATCH_USER_PROMPT = """Conduct independent research and provide evidence-based scoring for EACH question below.
+
+                    City: {city_name}
+                    Address: {city_address}
+                    Pillar: {pillar_name}
+                    Year: {year}
+
+                    {questions_block}
+
+                    SEARCH THE WEB for verifiable evidence for every question and provide your assessment.
+
+                    Remember: Return ONLY a single JSON object of the form {{"results": [...]}} with one entry per question, as specified. Report details for only the MOST TRUSTWORTHY source per question."""
+
+_PILLAR_USER_PROMPT = """Research and score the following pillar:
+
+                    City: {city_name}
+                    Full Address: {city_address}
+                    Pillar: {pillar_name}
+                    Assessment Year: {year}
+
+                    Conduct comprehensive web research using the search strategies outlined above. Find real evidence from trustworthy sources and provide your independent scoring with clear justification.
+
+                    Remember: Search for official data, government reports, international organization data, and academic research. Provide verifiable evidence-based scoring."""
+
+_CITY_USER_PROMPT = """Conduct comprehensive city-wide assessment:
+
+                City: {city_name}
+                Address: {city_address}
+                Year: {year}
+                aIScore:{aIScore}
+                {evaluator_context}
+
+                SEARCH THE WEB comprehensively for city-level data. Synthesize findings across all 14 pillars. Provide holistic Veridian Urban Index evaluation with clear evidence."""
+
 class VerdianAIResearchService:
     """AI service that conducts independent research and evidence-based scoring"""
 
     def __init__(self):
         self.llm = None
         self._initialized = False
+        self._init_lock = asyncio.Lock()
         self.max_retries = 3
         self.retry_delay = 1  # seconds
+        # Caps in-flight LLM calls so concurrent analyses can't flood the provider
+        self._llm_semaphore = asyncio.Semaphore(settings.RESEARCH_CONCURRENCY)
+        # Prompt templates are parsed once; the chains are bound to the LLM in initialize()
+        self._question_prompt = ChatPromptTemplate.from_messages([
+            ("system", self._get_question_system_prompt()),
+            ("system", _QUESTION_CONTEXT_PROMPT),
+            ("user", _QUESTION_USER_PROMPT),
+        ])
+        self._question_batch_prompt = ChatPromptTemplate.from_messages([
+            ("system", self._get_question_batch_system_prompt()),
+            ("system", _QUESTION_BATCH_CONTEXT_PROMPT),
+            ("user", _QUESTION_BATCH_USER_PROMPT),
+        ])
+        self._pillar_prompt = ChatPromptTemplate.from_messages([
+            ("system", self._get_pillar_system_prompt()),
+            ("system", _PILLAR_CONTEXT_PROMPT),
+            ("user", _PILLAR_USER_PROMPT),
+        ])
+        self._city_prompt = ChatPromptTemplate.from_messages([
+            ("system", self._get_city_system_prompt()),
+            ("system", _CITY_CONTEXT_PROMPT),
+            ("user", _CITY_USER_PROMPT),
+        ])
+        self._question_chain = None
+        self._question_batch_chain = None
+        self._pillar_chain = None
+        self._city_chain = None
+        # Tokenizer for the context budget, loaded in initialize(); None = estimate
+        self._encoder = None
+        # A prompt edit must not serve results produced by the previous wording
+        research_cache.set_salt(
+            self._get_question_system_prompt(), _QUESTION_CONTEXT_PROMPT, _QUESTION_USER_PROMPT,
+            self._get_question_batch_system_prompt(), _QUESTION_BATCH_CONTEXT_PROMPT, _QUESTION_BATCH_USER_PROMPT,
+            self._get_pillar_system_prompt(), _PILLAR_CONTEXT_PROMPT, _PILLAR_USER_PROMPT,
+            self._get_city_system_prompt(), _CITY_CONTEXT_PROMPT, _CITY_USER_PROMPT,
+            *(PillarPrompts.get_pillar_context(pillar_id) for pillar_id in range(1, 15)),
+        )
 
     async def initialize(self):
         """Initialize the LLM with retry logic"""
         if self._initialized:
             return
 
-        for attempt in range(self.max_retries):
-            try:
-                self.llm = llm_factory.create_llm()
-                self._initialized = True
-                logger.info(f"✅ Veridian AI Research Service initialized with {settings.LLM_PROVIDER}")
+        # Concurrent first callers wait here; only the first one builds the clients
+        async with self._init_lock:
+            if self._initialized:
                 return
-            except Exception as e:
-                logger.error(f"Initialization attempt {attempt + 1} failed: {e}")
-                if attempt < self.max_retries - 1:
-                    await asyncio.sleep(self.retry_delay)
-                    continue
-                else:
-                    raise RuntimeError(f"Failed to initialize after {self.max_retries} attempts: {e}")
+
+            for attempt in range(self.max_retries):
+                try:
+                    self._bind_llm(llm_factory.create_llm())
+                    if self._encoder is None:
+                        # Loading may download the encoding, so keep it off the event loop
+                        self._encoder = await asyncio.to_thread(self._load_encoder)
+                    self._initialized = True
+                    logger.info("✅ Veridian AI Research Service initialized with %s", settings.LLM_PROVIDER)
+                    return
+                except Exception as e:
+                    logger.error("Initialization attempt %s failed: %s", attempt + 1, e)
+                    if attempt < self.max_retries - 1:
+                        await asyncio.sleep(self.retry_delay)
+                        continue
+                    else:
+                        raise RuntimeError(f"Failed to initialize after {self.max_retries} attempts: {e}")
+
+    def _bind_llm(self, llm):
+        """Use llm for research and compose the prompt | llm | parser chains once"""
+        self.llm = llm
+        parser = StrOutputParser()
+        self._question_chain = self._question_prompt | llm | parser
+        self._question_batch_chain = self._question_batch_prompt | llm | parser
+        self._pillar_chain = self._pillar_prompt | llm | parser
+        self._city_chain = self._city_prompt | llm | parser
+
+    @staticmethod
+    def _load_encoder():
+        """Get the tokenizer for the configured model, or None if it can't be loaded"""
+        try:
+            try:
+                return tiktoken.encoding_for_model(llm_factory.get_current_provider_name())
+            except KeyError:
+                return tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning("Tokenizer unavailable, estimating context tokens from length: %s", e)
+            return None
+
+    def _truncate_to_tokens(self, text: str, budget: int) -> str:
+        """Cut text to at most budget tokens (about 4 characters each without a tokenizer)"""
+        # A BPE token spans at least one UTF-8 byte, so a short enough encoding
+        # can't exceed the budget (len(text) alone undercounts multibyte text)
+        if budget <= 0 or len(text.encode("utf-8")) <= budget:
+            return text
+
+        if self._encoder is None:
+            if len(text) <= budget * 4:
+                return text
+            logger.warning("Context of ~%s tokens truncated to %s", len(text) // 4, budget)
+            return text[:budget * 4] + "\n[... truncated]"
+
+        tokens = self._encoder.encode(text, disallowed_special=())
+        if len(tokens) <= budget:
+            return text
+        logger.warning("Context of %s tokens truncated to %s", len(tokens), budget)
+        return self._encoder.decode(tokens[:budget]) + "\n[... truncated]"
 
     async def _ensure_initialized(self):
         """Ensure LLM is initialized before use"""
-        if not self._initialized or self.llm is None:
+        if not self._initialized:
             await self.initialize()
 
     async def research_and_score_question(
@@ -65,30 +254,41 @@ class VerdianAIResearchService:
             
             Returns comprehensive evidence-based scoring with detailed source tracking
             """
+            if year is None:
+                year = datetime.now().year
+
+            cache_key = research_cache.make_key(
+                "q", city_name, city_address, pillarID, pillar_name,
+                question_text, scoreProgress, evaluator_score, year
+            )
+            cached = research_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            # Identical questions researched at the same time share one LLM call
+            return await research_cache.run_once(cache_key, lambda: self._research_question(
+                city_name, city_address, pillarID, pillar_name, question_text,
+                scoreProgress, evaluator_score, year, cache_key
+            ))
+
+    async def _research_question(
+            self,
+            city_name: str,
+            city_address: str,
+            pillarID: int,
+            pillar_name: str,
+            question_text: str,
+            scoreProgress: Optional[float],
+            evaluator_score: Optional[float],
+            year: int,
+            cache_key: str
+        ) -> Dict[str, Any]:
+            """Run the question research and cache a successful result"""
             try:
                 await self._ensure_initialized()
                 
-                if year is None:
-                    year = datetime.now().year
-                
                 pillar_context = PillarPrompts.get_pillar_context(pillarID)
 
-                prompt = ChatPromptTemplate.from_messages([
-                    ("system", self._get_question_system_prompt()),
-                    ("user", """Conduct independent research and provide evidence-based scoring.
-                     
-                    City: {city_name}
-                    Address: {city_address}
-                    Question: {question_text}
-                    Pillar: {pillar_name}
-                    Year: {year}
-                    {evaluator_context}
-
-                    SEARCH THE WEB for verifiable evidence and provide your assessment.
-                    
-                    Remember: Return ONLY a single JSON object with the EXACT structure specified. Report details for only the MOST TRUSTWORTHY source.""")
-                ])
-
                 evaluator_context = ""
                 if evaluator_score is not None:
                     evaluator_context = f"Evaluator Score: {evaluator_score}/4, Progress: {scoreProgress}%" if evaluator_score else "No evaluator score provided"
@@ -96,59 +296,32 @@ class VerdianAIResearchService:
                      # Execute with retry logic
                 for attempt in range(self.max_retries):
                     try:
-
-                        chain = prompt | self.llm | StrOutputParser()
-                        
-                        result = await chain.ainvoke({
-                            "city_name": city_name,
-                            "city_address": city_address,
-                            "question_text": question_text,
-                            "pillar_name": pillar_name,
-                            "pillar_context": pillar_context,
-                            "year": year,
-                            "evaluator_score": evaluator_score if evaluator_score is not None else "Not provided",
-                            "scoreProgress": scoreProgress if scoreProgress is not None else 0,
-                            "evaluator_context": evaluator_context
-                        })
+                        async with self._llm_semaphore:
+                            result = await self._question_chain.ainvoke({
+                                "city_name": city_name,
+                                "city_address": city_address,
+                                "question_text": question_text,
+                                "pillar_name": pillar_name,
+                                "pillar_context": pillar_context,
+                                "year": year,
+                                "evaluator_score": evaluator_score if evaluator_score is not None else "Not provided",
+                                "scoreProgress": scoreProgress if scoreProgress is not None else 0,
+                                "evaluator_context": evaluator_context
+                            })
                         
                         if not result or result.strip() == "{}":
                             continue  # retry
 
 
                         # Parse and validate response
-                        cleaned = self._clean_json_response(result)
-                        analysis = self._validate_question_response(json.loads(cleaned))
-                        
-                        # Calculate discrepancy
-                        discrepancy = None
-                        if evaluator_score is not None:
-                            discrepancy = abs(analysis['ai_progress'] - ((evaluator_score/4)*100))
-                        else:
-                            discrepancy = analysis['ai_progress']
-                
+                        analysis = self._validate_question_response(self._parse_json_response(result))
                         
-                        return {
-                            "success": True,
-                            "question": question_text,
-                            "year": year,
-                            "ai_score": analysis['ai_score'],
-                            "ai_progress": analysis['ai_progress'],
-                            "discrepancy": discrepancy,
-                            "confidence_level": analysis['confidence_level'],
-                            "data_sources_count": analysis['data_sources_count'],
-                            "evidence_summary": analysis['evidence_summary'],
-                            "red_flag": analysis.get('red_flag', ''),
-                            "geographic_equity_note": analysis.get('geographic_equity_note', ''),
-                            "source_type": analysis['source_type'],
-                            "source_name": analysis['source_name'],
-                            "source_url": analysis['source_url'],
-                            "source_data_year": analysis['source_data_year'],
-                            "source_data_extract": analysis['source_data_extract'],
-                            "source_trust_level": analysis['source_trust_level']
-                        }
+                        response = self._build_question_result(question_text, year, evaluator_score, analysis)
+                        research_cache.set(cache_key, response, settings.RESEARCH_CACHE_QUESTION_TTL)
+                        return response
 
                     except (json.JSONDecodeError, ValueError) as e:
-                        logger.error(f"JSON parse error on attempt {attempt + 1}: {e}")
+                        logger.error("JSON parse error on attempt %s: %s", attempt + 1, e)
                         if attempt < self.max_retries - 1:
                             await asyncio.sleep(self.retry_delay)
                             continue
@@ -156,12 +329,141 @@ class VerdianAIResearchService:
                             raise
 
             except Exception as e:
-                logger.error(f"Error in question research: {e}", exc_info=True)
+                logger.error("Error in question research: %s", e, exc_info=True)
                 return {
                     "success": False,
                     "error": str(e)
                 }
             
+    async def research_and_score_questions(
+            self,
+            city_name: str,
+            city_address: str,
+            pillarID: int,
+            pillar_name: str,
+            questions: List[Dict[str, Any]],
+            year: int = None
+        ) -> List[Dict[str, Any]]:
+            """
+            Research several questions of one pillar, returning one result per question in order
+
+            Each item of questions holds question_text, scoreProgress and evaluator_score.
+            Cache misses are sent RESEARCH_QUESTION_BATCH_SIZE at a time in a single
+            prompt, so the long system prompt is paid once per batch instead of once
+            per question; a batch that can't be parsed falls back to per-question calls.
+            """
+            if year is None:
+                year = datetime.now().year
+
+            results: List[Optional[Dict[str, Any]]] = [None] * len(questions)
+            pending = []
+            for index, item in enumerate(questions):
+                cache_key = research_cache.make_key(
+                    "q", city_name, city_address, pillarID, pillar_name,
+                    item["question_text"], item.get("scoreProgress"), item.get("evaluator_score"), year
+                )
+                cached = research_cache.get(cache_key)
+                if cached is not None:
+                    results[index] = cached
+                else:
+                    pending.append((index, item, cache_key))
+
+            batch_size = max(1, settings.RESEARCH_QUESTION_BATCH_SIZE)
+            if batch_size == 1:
+                # Batching disabled: one call (and one cache entry) per question
+                answers = await asyncio.gather(*(
+                    self.research_and_score_question(
+                        city_name, city_address, pillarID, pillar_name, item["question_text"],
+                        item.get("scoreProgress"), item.get("evaluator_score"), year
+                    )
+                    for _, item, _ in pending
+                ))
+                for (index, _, _), answer in zip(pending, answers):
+                    results[index] = answer
+                return results
+
+            batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+            answers = await asyncio.gather(*(
+                self._research_question_batch(city_name, city_address, pillarID, pillar_name, batch, year)
+                for batch in batches
+            ))
+            for answer in answers:
+                for index, response in answer.items():
+                    results[index] = response
+            return results
+
+    async def _research_question_batch(
+            self,
+            city_name: str,
+            city_address: str,
+            pillarID: int,
+            pillar_name: str,
+            batch: List[tuple],
+            year: int
+        ) -> Dict[int, Dict[str, Any]]:
+            """Research one batch of (index, item, cache_key) in a single prompt; returns index -> result"""
+            responses: Dict[int, Dict[str, Any]] = {}
+            try:
+                await self._ensure_initialized()
+
+                blocks = []
+                for index, item, _ in batch:
+                    evaluator_score = item.get("evaluator_score")
+                    evaluator_context = "No evaluator score provided"
+                    if evaluator_score:
+                        evaluator_context = f"Evaluator Score: {evaluator_score}/4, Progress: {item.get('scoreProgress')}%"
+                    blocks.append(f"Q{index}: {item['question_text']}\n{evaluator_context}\n---")
+
+                async with self._llm_semaphore:
+                    result = await self._question_batch_chain.ainvoke({
+                        "city_name": city_name,
+                        "city_address": city_address,
+                        "pillar_name": pillar_name,
+                        "pillar_context": PillarPrompts.get_pillar_context(pillarID),
+                        "year": year,
+                        "questions_block": "\n".join(blocks),
+                    })
+
+                entries = self._parse_json_response(result).get("results") or []
+                by_id = {}
+                for entry in entries:
+                    if isinstance(entry, dict):
+                        by_id[str(entry.get("id", "")).lstrip("Qq")] = entry
+
+                for index, item, cache_key in batch:
+                    entry = by_id.get(str(index))
+                    if entry is None:
+                        continue
+                    try:
+                        analysis = self._validate_question_response(entry)
+                    except ValueError as e:
+                        logger.warning("Batched answer for question %s invalid: %s", index, e)
+                        continue
+                    response = self._build_question_result(
+                        item["question_text"], year, item.get("evaluator_score"), analysis
+                    )
+                    research_cache.set(cache_key, response, settings.RESEARCH_CACHE_QUESTION_TTL)
+                    responses[index] = response
+
+            except Exception as e:
+                logger.error("Error in batched question research: %s", e, exc_info=True)
+
+            # Anything the batch didn't answer usably is researched on its own
+            missing = [(index, item) for index, item, _ in batch if index not in responses]
+            if missing:
+                logger.warning("Falling back to per-question research for %s of %s questions", len(missing), len(batch))
+                answers = await asyncio.gather(*(
+                    self.research_and_score_question(
+                        city_name, city_address, pillarID, pillar_name, item["question_text"],
+                        item.get("scoreProgress"), item.get("evaluator_score"), year
+                    )
+                    for _, item in missing
+                ))
+                for (index, _), answer in zip(missing, answers):
+                    responses[index] = answer
+
+            return responses
+
     async def research_and_score_pillar(
         self,
         city_name: str,
@@ -189,12 +491,39 @@ class VerdianAIResearchService:
         Returns:
             Dictionary with research results and scoring
         """
+        if year is None:
+            year = datetime.now().year
+
+        cache_key = research_cache.make_key(
+            "p", city_name, city_address, pillarId, pillar_name,
+            questions_context, evaluator_score, aIScore, year
+        )
+        cached = research_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Identical pillars researched at the same time share one LLM call
+        return await research_cache.run_once(cache_key, lambda: self._research_pillar(
+            city_name, city_address, pillarId, pillar_name, questions_context,
+            evaluator_score, aIScore, year, cache_key
+        ))
+
+    async def _research_pillar(
+        self,
+        city_name: str,
+        city_address: str,
+        pillarId: int,
+        pillar_name: str,
+        questions_context: Optional[str],
+        evaluator_score: Optional[float],
+        aIScore: Optional[float],
+        year: int,
+        cache_key: str
+    ) -> Dict[str, Any]:
+        """Run the pillar research and cache a successful result"""
         try:
             await self._ensure_initialized()
             
-            if year is None:
-                year = datetime.now().year
-            
             # Get pillar-specific context
             pillar_context = PillarPrompts.get_pillar_context(pillarId)
             
@@ -212,52 +541,32 @@ class VerdianAIResearchService:
                 else "No previous AI score available."
             )
             
-            # Create the prompt
-            prompt = ChatPromptTemplate.from_messages([
-                ("system",self._get_pillar_system_prompt()),
-                (
-                    "user",
-                    """Research and score the following pillar:
-
-                    City: {city_name}
-                    Full Address: {city_address}
-                    Pillar: {pillar_name}
-                    Assessment Year: {year}
-
-                    Conduct comprehensive web research using the search strategies outlined above. Find real evidence from trustworthy sources and provide your independent scoring with clear justification.
-
-                    Remember: Search for official data, government reports, international organization data, and academic research. Provide verifiable evidence-based scoring."""
-                )
-            ])
-            
                        # Execute with retry logic
             for attempt in range(self.max_retries):
                 try:
-                    chain = prompt | self.llm | StrOutputParser()
-                    
-                    result = await chain.ainvoke({
-                        "city_name": city_name,
-                        "city_address": city_address,
-                        "pillar_name": pillar_name,
-                        "year": year,
-                        "pillar_context": pillar_context,
-                        "ai_input_context": ai_input_context,
-                        "evaluator_context": evaluator_context
-                    })
+                    async with self._llm_semaphore:
+                        result = await self._pillar_chain.ainvoke({
+                            "city_name": city_name,
+                            "city_address": city_address,
+                            "pillar_name": pillar_name,
+                            "year": year,
+                            "pillar_context": pillar_context,
+                            "ai_input_context": ai_input_context,
+                            "evaluator_context": evaluator_context
+                        })
                     
                     if not result or result.strip() == "{}":
                         continue  # retry
                 
                     # Parse and validate
-                    cleaned = self._clean_json_response(result)
-                    analysis = self._validate_pillar_response(json.loads(cleaned))
+                    analysis = self._validate_pillar_response(self._parse_json_response(result))
                     
                     discrepancy = self._calculate_discrepancy(
                         analysis['ai_progress'],
                         evaluator_score
                     )
                     
-                    return {
+                    response = {
                         "success": True,
                         "pillar": pillar_name,
                         "pillar_id": pillarId,
@@ -275,16 +584,18 @@ class VerdianAIResearchService:
                         "year": year,
                         "timestamp": datetime.now().isoformat()
                     }
+                    research_cache.set(cache_key, response, settings.RESEARCH_CACHE_PILLAR_TTL)
+                    return response
                     
                 except (json.JSONDecodeError, ValueError) as e:
-                    logger.error(f"JSON parse error on attempt {attempt + 1}: {e}")
+                    logger.error("JSON parse error on attempt %s: %s", attempt + 1, e)
                     if attempt < self.max_retries - 1:
                         await asyncio.sleep(self.retry_delay)
                         continue
                     else:
                         raise
         except Exception as e:
-            logger.error(f"Error in pillar research for {pillar_name}: {e}", exc_info=True)
+            logger.error("Error in pillar research for %s: %s", pillar_name, e, exc_info=True)
             return {
                 "success": False,
                 "error": str(e),
@@ -310,28 +621,41 @@ class VerdianAIResearchService:
             pillar_scores: Optional list of AI pillar scores
             year: Assessment year
         """
+        if year is None:
+            year = datetime.now().year
+
+        cache_key = research_cache.make_key(
+            "c", city_name, city_address, evaluator_score, aIScore,
+            pillars_context, year
+        )
+        cached = research_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Identical city assessments requested at the same time share one LLM call
+        return await research_cache.run_once(cache_key, lambda: self._research_city(
+            city_name, city_address, evaluator_score, aIScore, pillars_context,
+            year, cache_key
+        ))
+
+    async def _research_city(
+        self,
+        city_name: str,
+        city_address: str,
+        evaluator_score: Optional[float],
+        aIScore: Optional[float],
+        pillars_context: Optional[str],
+        year: int,
+        cache_key: str
+    ) -> Dict[str, Any]:
+        """Run the city research and cache a successful result"""
         try:
             await self._ensure_initialized()
             
-            if year is None:
-                year = datetime.now().year
-            
-            # Build pillar summary context
-            pillars_context = "\n**PILLAR-LEVEL FINDINGS** (for synthesis):\n" + pillars_context
-            
-            
-            prompt = ChatPromptTemplate.from_messages([
-                ("system",self._get_city_system_prompt()),
-                ("user", """Conduct comprehensive city-wide assessment:
-
-                City: {city_name}
-                Address: {city_address}
-                Year: {year}
-                aIScore:{aIScore}
-                {evaluator_context}
-
-                SEARCH THE WEB comprehensively for city-level data. Synthesize findings across all 14 pillars. Provide holistic Veridian Urban Index evaluation with clear evidence.""")
-            ])
+            # Build pillar summary context, capped so a large city can't blow up the prompt
+            pillars_context = "\n**PILLAR-LEVEL FINDINGS** (for synthesis):\n" + self._truncate_to_tokens(
+                pillars_context, settings.RESEARCH_CONTEXT_TOKEN_BUDGET
+            )
 
             evaluator_context = ""
             if evaluator_score is not None:
@@ -339,30 +663,28 @@ class VerdianAIResearchService:
 
             for attempt in range(self.max_retries):
                 try:
-                    chain = prompt | self.llm | StrOutputParser()
-                    
-                    result = await chain.ainvoke({
-                        "city_name": city_name,
-                        "city_address": city_address,
-                        "pillars_context": pillars_context,
-                        "year": year,
-                        "aIScore":aIScore if aIScore else "Not provided",
-                        "evaluator_context": evaluator_context
-                    })
+                    async with self._llm_semaphore:
+                        result = await self._city_chain.ainvoke({
+                            "city_name": city_name,
+                            "city_address": city_address,
+                            "pillars_context": pillars_context,
+                            "year": year,
+                            "aIScore":aIScore if aIScore else "Not provided",
+                            "evaluator_context": evaluator_context
+                        })
 
                     if not result or result.strip() == "{}":
                         continue  # retry
 
                      # Parse and validate
-                    cleaned = self._clean_json_response(result)
-                    analysis = self._validate_city_response(json.loads(cleaned))
+                    analysis = self._validate_city_response(self._parse_json_response(result))
                     
                     discrepancy = self._calculate_discrepancy(
                         analysis['ai_progress'],
                         evaluator_score
                     )
                     
-                    return {
+                    response = {
                         "success": True,
                         "city": city_name,
                         "ai_score": analysis['ai_score'],
@@ -379,15 +701,17 @@ class VerdianAIResearchService:
                         "data_transparency_note": analysis.get('data_transparency_note', ''),
                         "year": year
                     }
+                    research_cache.set(cache_key, response, settings.RESEARCH_CACHE_CITY_TTL)
+                    return response
                 except (json.JSONDecodeError, ValueError) as e:
-                    logger.error(f"JSON parse error on attempt {attempt + 1}: {e}")
+                    logger.error("JSON parse error on attempt %s: %s", attempt + 1, e)
                     if attempt < self.max_retries - 1:
                         await asyncio.sleep(self.retry_delay)
                         continue
                     else:
                         raise
         except Exception as e:
-            logger.error(f"Error in city research: {e}", exc_info=True)
+            logger.error("Error in city research: %s", e, exc_info=True)
             return {"success": False, "error": str(e)}
 
     # ==================== VALIDATION METHODS ====================
@@ -416,7 +740,7 @@ class VerdianAIResearchService:
         
         # Validate confidence level
         if data['confidence_level'] not in ['High', 'Medium', 'Low']:
-            logger.warning(f"Invalid confidence level: {data['confidence_level']}, defaulting to 'Medium'")
+            logger.warning("Invalid confidence level: %s, defaulting to 'Medium'", data['confidence_level'])
             data['confidence_level'] = 'Medium'
         
         return data
@@ -474,6 +798,41 @@ class VerdianAIResearchService:
 
     # ==================== UTILITY METHODS ====================
 
+    def _build_question_result(
+        self,
+        question_text: str,
+        year: int,
+        evaluator_score: Optional[float],
+        analysis: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Shape a validated question analysis into the service's result dict"""
+        # Calculate discrepancy
+        discrepancy = None
+        if evaluator_score is not None:
+            discrepancy = abs(analysis['ai_progress'] - ((evaluator_score/4)*100))
+        else:
+            discrepancy = analysis['ai_progress']
+
+        return {
+            "success": True,
+            "question": question_text,
+            "year": year,
+            "ai_score": analysis['ai_score'],
+            "ai_progress": analysis['ai_progress'],
+            "discrepancy": discrepancy,
+            "confidence_level": analysis['confidence_level'],
+            "data_sources_count": analysis['data_sources_count'],
+            "evidence_summary": analysis['evidence_summary'],
+            "red_flag": analysis.get('red_flag', ''),
+            "geographic_equity_note": analysis.get('geographic_equity_note', ''),
+            "source_type": analysis['source_type'],
+            "source_name": analysis['source_name'],
+            "source_url": analysis['source_url'],
+            "source_data_year": analysis['source_data_year'],
+            "source_data_extract": analysis['source_data_extract'],
+            "source_trust_level": analysis['source_trust_level']
+        }
+
     def _calculate_discrepancy(
         self, 
         ai_progress: float, 
@@ -485,66 +844,58 @@ class VerdianAIResearchService:
             return abs(ai_progress - evaluator_score)
         return ai_progress
     
-    def _clean_json_response(self, response: str) -> str:
+    def _parse_json_response(self, response: str) -> Dict[str, Any]:
         """
-        Clean LLM response to extract valid JSON.
+        Clean LLM response and parse the JSON object it contains.
         
         Args:
             response: Raw response from LLM
             
         Returns:
-            Cleaned JSON string
+            Parsed JSON object
         """
-        # Remove markdown code blocks
-        response = response.strip()
-        
-        # Remove ```json and ``` markers
-        if response.startswith('```'):
-            response = response.split('```', 2)[1]
-            if response.startswith('json'):
-                response = response[4:]
-            response = response.strip()
-        
-        # Find JSON object boundaries
+        # Decode from the first '{'; raw_decode stops at the end of that object,
+        # so a markdown fence or other text before/after it needs no stripping
         start_idx = response.find('{')
-        end_idx = response.rfind('}')
-        
-        if start_idx == -1 or end_idx == -1:
+        if start_idx == -1:
             raise ValueError("No valid JSON object found in response")
         
-        json_str = response[start_idx:end_idx + 1]
-        
-        # Replace smart quotes and special characters
-        json_str = json_str.replace('"', '"').replace('"', '"')
-        json_str = json_str.replace(''', "'").replace(''', "'")
-        json_str = json_str.replace('–', '-').replace('—', '-')
-        json_str = json_str.replace('…', '...')
+        # Normalise dashes/ellipsis and drop control characters (newlines kept) in one pass
+        json_str = response[start_idx:].translate(_JSON_CLEAN_TABLE)
         
-        # Remove control characters (but keep newlines for now)
-        json_str = re.sub(r'[\x00-\x08\x0b-\x0c\x0e-\x1f\x7f]', '', json_str)
+        # Usual case: the response is one clean object, which orjson parses fastest
+        end_idx = json_str.rfind('}')
+        if end_idx != -1:
+            try:
+                return orjson.loads(json_str[:end_idx + 1])
+            except orjson.JSONDecodeError:
+                pass
         
-        # Try to parse to validate
+        # Otherwise (trailing prose with braces, strictness differences) stop at the end of the object
         try:
-            json.loads(json_str)
-            return json_str
+            data, _ = _JSON_DECODER.raw_decode(json_str)
+            return data
         except json.JSONDecodeError as e:
-            logger.warning(f"JSON parse error at position {e.pos}: {e.msg}")
+            logger.warning("JSON parse error at position %s: %s", e.pos, e.msg)
             
             # Show error context
             start = max(0, e.pos - 100)
             end = min(len(json_str), e.pos + 100)
-            logger.warning(f"Context: ...{json_str[start:end]}...")
+            logger.warning("Context: ...%s...", json_str[start:end])
             
-            # Try to fix common issues
-            json_str_fixed = self._fix_json_escaping(json_str)
+            # Try to fix common issues (on the object span only, so the
+            # escaping fixer never walks trailing prose)
+            if end_idx == -1:
+                raise ValueError(f"Could not parse JSON: {e.msg} at position {e.pos}")
+            json_str_fixed = self._fix_json_escaping(json_str[:end_idx + 1])
             
             try:
-                json.loads(json_str_fixed)
+                data, _ = _JSON_DECODER.raw_decode(json_str_fixed)
                 logger.info("Successfully fixed JSON")
-                return json_str_fixed
+                return data
             except json.JSONDecodeError as e2:
-                logger.error(f"Failed to fix JSON: {e2.msg} at position {e2.pos}")
-                logger.error(f"Problematic JSON (first 500 chars):\n{json_str[:500]}")
+                logger.error("Failed to fix JSON: %s at position %s", e2.msg, e2.pos)
+                logger.error("Problematic JSON (first 500 chars):\n%s", json_str[:500])
                 raise ValueError(f"Could not parse JSON: {e2.msg} at position {e2.pos}")
 
     def _fix_json_escaping(self, json_str: str) -> str:
@@ -618,6 +969,102 @@ class VerdianAIResearchService:
 
     def _get_question_system_prompt(self) -> str:
         """Get optimized system prompt for question-level research"""
+        return self._get_question_research_rules() + """
+                **CRITICAL OUTPUT REQUIREMENTS**:
+                You MUST return ONLY a single valid JSON object with this EXACT structure (no additional fields, no field suffixes like _2, _3, etc.):
+                
+                {{
+                    "ai_score": <0-4 || null>,
+                    "ai_progress": <0.00-100>,
+                    "confidence_level": "<High|Medium|Low | (NA | UnKnown if ai_score is null)>",
+                    "evidence_summary": "<100-150 words summarizing key findings and rationale>",
+                    "red_flag": "<10-150 words: any concerns found, or empty string if none>",
+                    "geographic_equity_note": "<10-60 words: comment on inequality if detected, or empty string if none>",
+                    "data_sources_count": <number of sources consulted (1-5)>,
+                    "source_type": "<Government|International|Academic|NGO|Private|Media>",
+                    "source_name": "<10-60 words: organization name of the MOST TRUSTWORTHY source>",
+                    "source_url": "<URL if available, or 'Not available'>",
+                    "source_data_year": <year of data>,
+                    "source_trust_level": <1-7>,
+                    "source_data_extract": "<10-150 words: specific finding/data point from this source>"
+                }}
+
+                **JSON OUTPUT FORMAT REQUIREMENTS**:
+                CRITICAL: You MUST return valid, fully parseable JSON only. Failure to follow any rule below is unacceptable.
+
+                1. Use ONLY straight double quotes (") for all JSON keys and string values
+                2. Do NOT use smart quotes (" "), curly quotes, or any Unicode quote variants
+                3. Escape all special characters in string values:
+                - Newlines: \\n
+                - Tabs: \\t
+                - Quotes within strings: \\"
+                - Backslashes: \\\\
+                4. Do NOT include actual line breaks inside string values
+                5. Use regular hyphens (-) not em-dashes (—) or en-dashes (–)
+                6. Keep string values concise - aim for single paragraphs without line breaks
+                7. Test that your JSON is valid before responding
+                8. Use ASCII characters only (no Unicode characters such as \u2019, smart apostrophes, or typographic symbols).
+                9. Before responding, verify that:
+                    - All string values are closed
+                    - The JSON object ends with a closing brace }}
+                        
+                    Failure Handling:
+                        If the response risks being truncated, exceeds length limits, or violates any rule, return {{}} only.
+                        
+                Return ONLY a single JSON object
+                """
+
+    def _get_question_batch_system_prompt(self) -> str:
+        """System prompt for scoring several questions of one pillar in a single call"""
+        return self._get_question_research_rules() + """
+                **CRITICAL OUTPUT REQUIREMENTS**:
+                The user message lists several questions, each labelled with its id (Q<n>) and its own evaluator context. Research and score EACH question independently.
+                You MUST return ONLY a single valid JSON object of the form {{"results": [...]}} with one entry per question, in any order.
+                Each entry has an "id" field set to the question id (for example "Q3") plus exactly these fields (no additional fields, no field suffixes like _2, _3, etc.):
+                
+                {{
+                    "ai_score": <0-4 || null>,
+                    "ai_progress": <0.00-100>,
+                    "confidence_level": "<High|Medium|Low | (NA | UnKnown if ai_score is null)>",
+                    "evidence_summary": "<100-150 words summarizing key findings and rationale>",
+                    "red_flag": "<10-150 words: any concerns found, or empty string if none>",
+                    "geographic_equity_note": "<10-60 words: comment on inequality if detected, or empty string if none>",
+                    "data_sources_count": <number of sources consulted (1-5)>,
+                    "source_type": "<Government|International|Academic|NGO|Private|Media>",
+                    "source_name": "<10-60 words: organization name of the MOST TRUSTWORTHY source>",
+                    "source_url": "<URL if available, or 'Not available'>",
+                    "source_data_year": <year of data>,
+                    "source_trust_level": <1-7>,
+                    "source_data_extract": "<10-150 words: specific finding/data point from this source>"
+                }}
+
+                **JSON OUTPUT FORMAT REQUIREMENTS**:
+                CRITICAL: You MUST return valid, fully parseable JSON only. Failure to follow any rule below is unacceptable.
+
+                1. Use ONLY straight double quotes (") for all JSON keys and string values
+                2. Do NOT use smart quotes (" "), curly quotes, or any Unicode quote variants
+                3. Escape all special characters in string values:
+                - Newlines: \\n
+                - Tabs: \\t
+                - Quotes within strings: \\"
+                - Backslashes: \\\\
+                4. Do NOT include actual line breaks inside string values
+                5. Use regular hyphens (-) not em-dashes (—) or en-dashes (–)
+                6. Keep string values concise - aim for single paragraphs without line breaks
+                7. Test that your JSON is valid before responding
+                8. Use ASCII characters only (no Unicode characters such as \u2019, smart apostrophes, or typographic symbols).
+                9. Before responding, verify that:
+                    - All string values are closed
+                    - The JSON object ends with a closing brace }}
+                        
+                    Failure Handling:
+                        If the response risks being truncated, exceeds length limits, or violates any rule, return {{}} only.
+                        
+                Return ONLY the {{"results": [...]}} object
+                """
+
+    def _get_question_research_rules(self) -> str:
+        """Research process, scoring rubric and confidence rules shared by the question prompts"""
         return """
                 You are an expert urban analyst conducting independent research for the Veridian Urban Index.
 
@@ -627,9 +1074,9 @@ class VerdianAIResearchService:
                 **YOUR RESEARCH PROCESS**:
 
                 1. **MANDATORY WEB SEARCH FOR EVIDENCE ** You MUST search for:
-                -  "{city_name}" + specific question topic (official data)
-                - "{city_name}" government reports on this issue
-                - Search for: "{city_name}" + relevant pillar keywords
+                -  "<city>" + specific question topic (official data)
+                - "<city>" government reports on this issue
+                - Search for: "<city>" + relevant pillar keywords
                 - Search international databases: World Bank, UN-Habitat, WHO data for this city
                 - Search academic research on this city's performance in this area
 
@@ -656,9 +1103,6 @@ class VerdianAIResearchService:
                 - Claims without institutional backing
                 - Outdated data (flag if >3 years old)
 
-                **PILLAR-SPECIFIC CONTEXT**:
-                {pillar_context}
-
                 **SCORING RUBRIC (0-4)**:
                 - **4 (Excellent)**: Multiple Tier 5-7 sources confirm strong, equitable performance
                 - Verified institutional data
@@ -752,59 +1196,8 @@ class VerdianAIResearchService:
                 - **Low**: Single source, Tiers 1-3 only, outdated data, national-level only, or significant data gaps
                 -- If ai_score is null → confidence_level must be "NA" or "Unknown". 
 
-                **EVALUATOR CONTEXT** (if provided):
-                Human evaluator scored this as: {evaluator_score} and scoreProgress: {scoreProgress}%.
-                Use this as context but conduct INDEPENDENT research. Your score may differ based on evidence.
-
                 **OUTPUT AUDIENCE**: Responses must be readable by a general audience and avoid technical or internal scoring terminology.
-
-                **CRITICAL OUTPUT REQUIREMENTS**:
-                You MUST return ONLY a single valid JSON object with this EXACT structure (no additional fields, no field suffixes like _2, _3, etc.):
-                
-                {{
-                    "ai_score": <0-4 || null>,
-                    "ai_progress": <0.00-100>,
-                    "confidence_level": "<High|Medium|Low | (NA | UnKnown if ai_score is null)>",
-                    "evidence_summary": "<100-150 words summarizing key findings and rationale>",
-                    "red_flag": "<10-150 words: any concerns found, or empty string if none>",
-                    "geographic_equity_note": "<10-60 words: comment on inequality if detected, or empty string if none>",
-                    "data_sources_count": <number of sources consulted (1-5)>,
-                    "source_type": "<Government|International|Academic|NGO|Private|Media>",
-                    "source_name": "<10-60 words: organization name of the MOST TRUSTWORTHY source>",
-                    "source_url": "<URL if available, or 'Not available'>",
-                    "source_data_year": <year of data>,
-                    "source_trust_level": <1-7>,
-                    "source_data_extract": "<10-150 words: specific finding/data point from this source>"
-                }}
-
-                **JSON OUTPUT FORMAT REQUIREMENTS**:
-                CRITICAL: You MUST return valid, fully parseable JSON only. Failure to follow any rule below is unacceptable.
-
-                1. Use ONLY straight double quotes (") for all JSON keys and string values
-                2. Do NOT use smart quotes (" "), curly quotes, or any Unicode quote variants
-                3. Escape all special characters in string values:
-                - Newlines: \\n
-                - Tabs: \\t
-                - Quotes within strings: \\"
-                - Backslashes: \\\\
-                4. Do NOT include actual line breaks inside string values
-                5. Use regular hyphens (-) not em-dashes (—) or en-dashes (–)
-                6. Keep string values concise - aim for single paragraphs without line breaks
-                7. Test that your JSON is valid before responding
-                8. Use ASCII characters only (no Unicode characters such as \u2019, smart apostrophes, or typographic symbols).
-                9. Before responding, verify that:
-                    - All string values are closed
-                    - The JSON object ends with a closing brace }}
-                        
-                    Failure Handling:
-                        If the response risks being truncated, exceeds length limits, or violates any rule, return {{}} only.
-                        
-                Return ONLY a single JSON object
-
-                **RESEARCH NOW for**: {city_name} {city_address}
-                Question: {question_text}
-                Pillar: {pillar_name}
-                """
+"""
 
     def _get_pillar_system_prompt(self) -> str:
         """Get optimized system prompt for pillar-level research"""
@@ -825,16 +1218,16 @@ class VerdianAIResearchService:
                         1. **Search Strategy** - You MUST search for:
 
                         **Core Structural Sources**
-                        - Official city/municipal data: "{city_name} {pillar_name} official statistics"
-                        - Government reports: "{city_name} government {pillar_name} report"
-                        - International data: "World Bank {city_name}" OR "UN-Habitat {city_name}"
-                        - Academic research: "{city_name} {pillar_name} peer-reviewed study"
-                        - Recent news: "{city_name} {pillar_name} {year}"
+                        - Official city/municipal data: "<city> <pillar> official statistics"
+                        - Government reports: "<city> government <pillar> report"
+                        - International data: "World Bank <city>" OR "UN-Habitat <city>"
+                        - Academic research: "<city> <pillar> peer-reviewed study"
+                        - Recent news: "<city> <pillar> <year>"
 
                         **Dynamic Real-Time Sources**
-                        - Breaking developments: "{city_name} {pillar_name} latest news"
-                        - Social sentiment trends: "{city_name} protests complaints reactions social media"
-                        - Incident/event monitoring: "{city_name} disruption unrest outage strike violence emergency"
+                        - Breaking developments: "<city> <pillar> latest news"
+                        - Social sentiment trends: "<city> protests complaints reactions social media"
+                        - Incident/event monitoring: "<city> disruption unrest outage strike violence emergency"
                         - Local public discourse: city forums, verified public posts, reputable civic reporting
                         - Rapid updates from credible journalists, agencies, and institutions
 
@@ -959,15 +1352,6 @@ class VerdianAIResearchService:
                         - Outdated or contradictory data
                         - Unverified live claims
 
-                        **CONTEXT PROVIDED:**
-
-                        **Pillar Focus Areas:**
-                        {pillar_context}
-
-                        **Reference Scores (for context only - DO NOT copy these):**
-                        {evaluator_context}
-                        {ai_input_context}
-
                         **OUTPUT FORMAT:**
 
                         You MUST return ONLY valid JSON in this exact structure (no markdown, no explanations):
@@ -1101,15 +1485,6 @@ class VerdianAIResearchService:
 
             ---
 
-            **PILLAR SYNTHESIS CONTEXT**:
-            {pillars_context}
-
-            **REFERENCE SCORES** (for calibration only — do not copy):
-            {evaluator_context}
-            Previous AI Assessment: {aIScore}
-
-            ---
-
             **SCORING FRAMEWORK (0–4)**:
 
             4.0 (Excellent): Strong across all pillars, verified equity, robust institutions, transparent governance, sustainable trajectory
@@ -1255,9 +1630,7 @@ class VerdianAIResearchService:
             - The JSON object ends with a closing brace }}
 
             Failure Handling:
-            If the response risks being truncated, exceeds length limits, or violates any rule, return {{}} only.
-
-            **RESEARCH NOW for**: {city_name} {city_address}"""
+            If the response risks being truncated, exceeds length limits, or violates any rule, return {{}} only."""
 
 # Singleton instance
 veridian_ai_research_service = VerdianAIResearchService()
\ No newline at end of file
@@ -2,8 +2,10 @@
 Score analyzer service - LLM-powered analysis with database exception logging
 """
 import math
+import asyncio
 import logging
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Optional
+from app.config import settings
 from app.services.common.database_service import db_service
 from app.services.common.db_logger_service import db_logger_service
 from app.services.common.veridian_ai_research_service import veridian_ai_research_service
@@ -96,39 +98,90 @@ class ScoreAnalyzerService:
 
     def _get_city_data(self, city_id: Optional[int] = None):
         """Fetch city data with optional filtering"""
-        where_clause = f"where IsDeleted=0 and CityID={city_id}" if city_id else "where IsDeleted=0"
+        if city_id:
+            return db_service.read_with_query(
+                "Select CityID, CityName, State, Country from Cities where IsDeleted=0 and CityID=?",
+                (city_id,),
+            )
         return db_service.read_with_query(
-            f"Select CityID, CityName, State, Country from Cities {where_clause}"
+            "Select CityID, CityName, State, Country from Cities where IsDeleted=0"
         )
 
+    async def _analyze_city_stages(self, city: Any, semaphore: asyncio.Semaphore) -> dict[str, Any]:
+        """Run the question, pillar and city stages for one city and report the outcome"""
+        # The stages stay sequential because each reads the views the previous one updated
+        async with semaphore:
+            result: dict[str, Any] = {"city_id": city.CityID, "city_name": city.CityName}
+            try:
+                result["questions"] = await self.analyze_PillarQuestions(city)
+                result["pillars"] = await self.analyze_cityPillar(city)
+                result["city"] = await self.analyze_city(city)
+                result["success"] = True
+            except Exception as e:
+                logger.error("Failed to analyze city %s (%s): %s", city.CityID, city.CityName, e)
+                result["success"] = False
+                result["error"] = str(e)
+            return result
+
     async def analyze_all_cities_questions(self, city_id: Optional[int] = None) -> bool:
         """Analyze City Questions data for all cities or specific city"""
         try:
-            df = self._get_city_data(city_id)
+            df = await asyncio.to_thread(self._get_city_data, city_id)
 
             if df.empty:
                 logger.error("No cities found for analysis analyze_all_cities_questions endpoint")
                 return False
 
-            for city in df.itertuples(index=False):
-                try:
-                    await self.analyze_PillarQuestions(city)
-                    await self.analyze_cityPillar(city)
-                    await self.analyze_city(city)
-                except Exception as e:
-                    logger.error(f"Failed to analyze city {city.CityID} ({city.CityName}): {e}")
-                    continue
+            # Cities are independent, so several run at once. The TaskGroup
+            # owns the city tasks: if the job is cancelled (or something escapes
+            # _analyze_city_stages) the remaining cities are cancelled and
+            # awaited rather than left running unowned, as gather would
+            semaphore = asyncio.Semaphore(settings.ANALYSIS_CITY_CONCURRENCY)
+            async with asyncio.TaskGroup() as tg:
+                tasks = [
+                    tg.create_task(self._analyze_city_stages(city, semaphore))
+                    for city in df.itertuples(index=False)
+                ]
+
+            failed = sum(1 for task in tasks if not task.result()["success"])
+            if failed:
+                logger.error("%s of %s cities failed analysis", failed, len(tasks))
 
             return True
             
         except Exception as e:
-            logger.error(f"Error in analyze_all_cities_questions: {e}")
+            logger.error("Error in analyze_all_cities_questions: %s", e)
             raise
 
+    async def iter_all_cities_analysis(self, city_id: Optional[int] = None) -> AsyncIterator[dict[str, Any]]:
+        """
+        Analyze all cities (or a specific city) and yield one result per city
+        as soon as it finishes; pending cities are cancelled (and awaited) if the consumer stops
+        """
+        df = await asyncio.to_thread(self._get_city_data, city_id)
+
+        if df.empty:
+            logger.error("No cities found for analysis iter_all_cities_analysis endpoint")
+            return
+
+        semaphore = asyncio.Semaphore(settings.ANALYSIS_CITY_CONCURRENCY)
+        tasks = [
+            asyncio.create_task(self._analyze_city_stages(city, semaphore))
+            for city in df.itertuples(index=False)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Wait for cancelled cities to unwind so no upsert is left running unowned
+            await asyncio.gather(*tasks, return_exceptions=True)
+
     async def analyze_single_City(self, cityId: int) -> bool:
         """Analyze City Questions data for a specific city"""
         try:
-            df = self._get_city_data(cityId)
+            df = await asyncio.to_thread(self._get_city_data, cityId)
             if df.empty:
                 return False
 
@@ -138,13 +191,13 @@ class ScoreAnalyzerService:
             return True
             
         except Exception as e:
-            logger.error(f"Error in analyze_single_City (CityID: {cityId}): {e}")
+            logger.error("Error in analyze_single_City (CityID: %s): %s", cityId, e)
             raise
 
     async def analyze_city_pillars(self, cityId: int) -> bool:
         """Analyze City pillar data for a specific city"""
         try:
-            df = self._get_city_data(cityId)
+            df = await asyncio.to_thread(self._get_city_data, cityId)
             if df.empty:
                 return False
 
@@ -154,13 +207,13 @@ class ScoreAnalyzerService:
             return True
             
         except Exception as e:
-            logger.error(f"Error in analyze_city_pillars (CityID: {cityId}): {e}")
+            logger.error("Error in analyze_city_pillars (CityID: %s): %s", cityId, e)
             raise
 
     async def analyze_Single_Pillar(self, cityId: int, pillar_id: Optional[int] = None) -> bool:
         """Analyze specific pillar for a city"""
         try:
-            df = self._get_city_data(cityId)
+            df = await asyncio.to_thread(self._get_city_data, cityId)
             if df.empty:
                 return False
 
@@ -170,13 +223,13 @@ class ScoreAnalyzerService:
             return True
             
         except Exception as e:
-            logger.error(f"Error in analyze_Single_Pillar (CityID: {cityId}, PillarID: {pillar_id}): {e}")
+            logger.error("Error in analyze_Single_Pillar (CityID: %s, PillarID: %s): %s", cityId, pillar_id, e)
             raise
 
     async def analyze_questions_of_city_pillar(self, cityId: int, pillar_id: Optional[int] = None) -> bool:
         """Analyze questions for city pillar"""
         try:
-            df = self._get_city_data(cityId)
+            df = await asyncio.to_thread(self._get_city_data, cityId)
             if df.empty:
                 return False
 
@@ -186,7 +239,7 @@ class ScoreAnalyzerService:
             return True
             
         except Exception as e:
-            logger.error(f"Error in analyze_questions_of_city_pillar (CityID: {cityId}): {e}")
+            logger.error("Error in analyze_questions_of_city_pillar (CityID: %s): %s", cityId, e)
             raise
 
     def _build_question_record(self, row, ai_data, normalized_value: float) -> dict[str, Any]:
@@ -213,76 +266,107 @@ class ScoreAnalyzerService:
             "SourceTrustLevel": self.to_int_safe(ai_data["source_trust_level"])
         }
 
+    @staticmethod
+    def _normalized_value(row) -> float:
+        """Evaluator value of a question row, with missing/NaN read as 0"""
+        return 0 if (row.NormalizedValue is None or 
+                     (isinstance(row.NormalizedValue, float) and 
+                      math.isnan(row.NormalizedValue))) else row.NormalizedValue
+
+    async def _analyze_pillar_questions(self, city: Any, pillar_df) -> None:
+        """Research and upsert every question row of one pillar"""
+        questionList: list[dict[str, Any]] = []
+        rows = list(pillar_df.itertuples(index=False))
+        normalized_values = [self._normalized_value(row) for row in rows]
+        # Research every question of the pillar in one service call; it runs
+        # (or batches) the LLM calls concurrently and caps how many are in flight
+        answers = await veridian_ai_research_service.research_and_score_questions(
+            city.CityName,
+            f"State :{city.State}, Country :{city.Country}",
+            rows[0].PillarID,
+            rows[0].PillarName,
+            [
+                {
+                    "question_text": f" Question :{row.QuestionText}, Options :{row.Options}",
+                    "scoreProgress": row.ScoreProgress,
+                    "evaluator_score": round(normalized_value * 4.0),
+                }
+                for row, normalized_value in zip(rows, normalized_values)
+            ],
+        )
+
+        # The answers are already paid for, so one bad row or batch must not drop the rest
+        for row, ai_data, normalized_value in zip(rows, answers, normalized_values):
+            if ai_data and ai_data["success"]:
+                try:
+                    questionList.append(self._build_question_record(row, ai_data, normalized_value))
+                except Exception as e:
+                    logger.error("Error processing question %s for city %s: %s", row.QuestionID, city.CityID, e)
+                    continue
+
+                if len(questionList) == 10:
+                    await self._upsert_questions(city, questionList)
+                    questionList = []
+            else:
+                db_logger_service.log_message("WARNING", 
+                    f"AI analysis failed for QuestionID {row.QuestionID} in City {city.CityID}")
+        
+        if questionList:
+            await self._upsert_questions(city, questionList)
+
+    @staticmethod
+    async def _upsert_questions(city: Any, questionList: list[dict[str, Any]]) -> None:
+        """Upsert one batch of question records, logging (not raising) a failed batch"""
+        try:
+            await asyncio.to_thread(db_service.bulk_upsert_question_evaluations, questionList)
+        except Exception as e:
+            logger.error(
+                "Error upserting questions %s for city %s: %s",
+                [record["QuestionID"] for record in questionList], city.CityID, e,
+            )
+
     async def analyze_PillarQuestions(self, city: Any, pillar_id: Optional[int] = None) -> bool:
         """Analyze Pillar Questions data for a city"""
         try:
-            where = f"cityId = {city.CityID}"
+            where, params = "cityId = ?", (city.CityID,)
             if pillar_id is not None:
-                where = f"cityId = {city.CityID} and PillarID={pillar_id}"
+                where, params = "cityId = ? and PillarID = ?", (city.CityID, pillar_id)
 
 
-            df = db_service.get_view_data("vw_AiCityPillarQuestionEvaluations", where)
+            df = await asyncio.to_thread(
+                db_service.get_view_data, "vw_AiCityPillarQuestionEvaluations", where, params=params
+            )
             
             if not len(df):
                 db_logger_service.log_message("INFO", f"No pillar questions found for city {city.CityID} ({city.CityName})")
                 return False
             
-            pillarIds = [pillar_id] if pillar_id is not None else df["PillarID"].unique().tolist()
-            
-            for pillarId in pillarIds:
-                pillar_df = df[df["PillarID"] == pillarId]
-                questionList: list[dict[str, Any]] = []
-                
-                try:
-                    for row in pillar_df.itertuples(index=False):
-                        normalized_value = 0 if (row.NormalizedValue is None or 
-                                                  (isinstance(row.NormalizedValue, float) and 
-                                                   math.isnan(row.NormalizedValue))) else row.NormalizedValue
-                            
-                        try:
-                            ai_data = await veridian_ai_research_service.research_and_score_question(
-                                city.CityName,
-                                f"State :{city.State}, Country :{city.Country}",
-                                row.PillarID,
-                                row.PillarName,
-                                f" Question :{row.QuestionText}, Options :{row.Options}",
-                                row.ScoreProgress,
-                                round(normalized_value * 4.0),
-                                None
-                            )
-
-                            if ai_data["success"]:
-                                questionList.append(self._build_question_record(row, ai_data, normalized_value))
-                                
-                                if len(questionList) == 10:
-                                    db_service.bulk_upsert_question_evaluations(questionList)
-                                    questionList = []
-                            else:
-                                db_logger_service.log_message("WARNING", 
-                                    f"AI analysis failed for QuestionID {row.QuestionID} in City {city.CityID}")
-                                
-                        except Exception as e:
-                            logger.error(f"Error processing question {row.QuestionID} for city {city.CityID}: {e}")
-                            continue
-                    
-                    if questionList:
-                        db_service.bulk_upsert_question_evaluations(questionList)
-
-                except Exception as e:
-                    logger.error(f"Error analyzing pillar {pillarId} for city {city.CityID}: {e}")
-                    continue
+            # One pass over the view rows splits them by pillar; pillars then
+            # run concurrently (LLM calls are capped by the research service)
+            groups = list(df.groupby("PillarID", sort=False))
+            results = await asyncio.gather(
+                *(self._analyze_pillar_questions(city, pillar_df) for _, pillar_df in groups),
+                return_exceptions=True,
+            )
+
+            for (pillarId, _), result in zip(groups, results):
+                if isinstance(result, Exception):
+                    logger.error("Error analyzing pillar %s for city %s: %s", pillarId, city.CityID, result)
                     
             return True
             
         except Exception as e:
-            logger.error(f"Error in analyze_PillarQuestions for city {city.CityID}: {e}")
+            logger.error("Error in analyze_PillarQuestions for city %s: %s", city.CityID, e)
             raise
 
     async def analyze_cityPillar(self, city: Any, pillar_id: Optional[int] = None) -> bool:
         """Analyze city pillar data and generate evaluations"""
         try:
-            where = f"cityId = {city.CityID} and PillarID = {pillar_id}" if pillar_id else f"cityId = {city.CityID}"
-            df = db_service.get_view_data("vw_AiCityPillarEvaluation", where)
+            if pillar_id:
+                where, params = "cityId = ? and PillarID = ?", (city.CityID, pillar_id)
+            else:
+                where, params = "cityId = ?", (city.CityID,)
+            df = await asyncio.to_thread(db_service.get_view_data, "vw_AiCityPillarEvaluation", where, params=params)
             
             if not len(df):
                 db_logger_service.log_message("INFO", f"No pillar evaluations found for city {city.CityID} ({city.CityName})")
@@ -291,9 +375,12 @@ class ScoreAnalyzerService:
             pillarList: list[dict[str, Any]] = []
             pillarSourceList: list[dict[str, Any]] = []
             
-            for row in df.itertuples(index=False):
-                try:
-                    ai_data = await veridian_ai_research_service.research_and_score_pillar(
+            # Research all pillars of the city concurrently (capped by the research
+            # service), then build and upsert the records in row order
+            rows = list(df.itertuples(index=False))
+            results = await asyncio.gather(
+                *(
+                    veridian_ai_research_service.research_and_score_pillar(
                         city.CityName,
                         f"State :{city.State}, Country :{city.Country}",
                         row.PillarID,
@@ -302,24 +389,36 @@ class ScoreAnalyzerService:
                         row.EvaluatorProgress,
                         row.AIScore,
                     )
+                    for row in rows
+                ),
+                return_exceptions=True,
+            )
+
+            for row, ai_data in zip(rows, results):
+                try:
+                    if isinstance(ai_data, Exception):
+                        raise ai_data
 
                     if ai_data["success"]:
-                        for src in ai_data["sources"]:
-                            pillarSourceList.append({
+                        year = self.to_int_safe(ai_data['year'])
+                        pillarSourceList.extend(
+                            {
                                 "CityID": row.CityID,
-                                "DataYear": self.to_int_safe(ai_data['year']),
+                                "DataYear": year,
                                 "PillarID": row.PillarID,
                                 "SourceType": src["source_type"],
                                 "SourceName": src["source_name"],
                                 "SourceURL": src["source_url"],
                                 "DataExtract": src["data_extract"],
                                 "TrustLevel": self.to_int_safe(src["trust_level"])
-                            })
+                            }
+                            for src in ai_data["sources"]
+                        )
 
                         pillarList.append({
                             "CityID": row.CityID,
                             "PillarID": row.PillarID,
-                            "Year": self.to_int_safe(ai_data['year']),
+                            "Year": year,
                             "AIScore": self.to_float_safe(ai_data["ai_score"]),
                             "AIProgress": self.to_float_safe(ai_data["ai_progress"]),
                             "EvaluatorProgress": self.to_float_safe(row.EvaluatorProgress),
@@ -334,7 +433,7 @@ class ScoreAnalyzerService:
                         })
 
                         if len(pillarList) == 5:
-                            db_service.bulk_upsert_pillar_evaluations(pillarList, pillarSourceList)
+                            await asyncio.to_thread(db_service.bulk_upsert_pillar_evaluations, pillarList, pillarSourceList)
                             pillarList = []
                             pillarSourceList = []
                     else:
@@ -342,23 +441,25 @@ class ScoreAnalyzerService:
                             f"AI analysis failed for PillarID {row.PillarID} in City {city.CityID}")
 
                 except Exception as e:
-                    logger.error(f"Error processing pillar {row.PillarID} for city {city.CityID}: {e}")
+                    logger.error("Error processing pillar %s for city %s: %s", row.PillarID, city.CityID, e)
                     continue
 
             if pillarList:
-                db_service.bulk_upsert_pillar_evaluations(pillarList, pillarSourceList)
+                await asyncio.to_thread(db_service.bulk_upsert_pillar_evaluations, pillarList, pillarSourceList)
                 return True
                 
             return False
             
         except Exception as e:
-            logger.error(f"Error in analyze_cityPillar for city {city.CityID}: {e}")
+            logger.error("Error in analyze_cityPillar for city %s: %s", city.CityID, e)
             raise
 
     async def analyze_city(self, city: Any) -> bool:
         """Analyze overall city data and generate comprehensive evaluation"""
         try:
-            df = db_service.get_view_data("vw_AiCityEvaluations", f"cityId = {city.CityID}")
+            df = await asyncio.to_thread(
+                db_service.get_view_data, "vw_AiCityEvaluations", "cityId = ?", params=(city.CityID,)
+            )
             
             if not len(df):
                 db_logger_service.log_message("INFO", f"No city evaluations found for city {city.CityID} ({city.CityName})")
@@ -395,23 +496,23 @@ class ScoreAnalyzerService:
                         })
 
                         if len(cityList) == 10:
-                            db_service.bulk_upsert_city_evaluations(cityList)
+                            await asyncio.to_thread(db_service.bulk_upsert_city_evaluations, cityList)
                             cityList = []
                     else:
                         db_logger_service.log_message("WARNING", f"AI analysis failed for City {city.CityID}")
 
                 except Exception as e:
-                    logger.error(f"Error processing city evaluation for {city.CityID}: {e}")
+                    logger.error("Error processing city evaluation for %s: %s", city.CityID, e)
                     continue
 
             if cityList:
-                db_service.bulk_upsert_city_evaluations(cityList)
+                await asyncio.to_thread(db_service.bulk_upsert_city_evaluations, cityList)
                 return True
 
             return False
             
         except Exception as e:
-            logger.error(f"Error in analyze_city for city {city.CityID}: {e}")
+            logger.error("Error in analyze_city for city %s: %s", city.CityID, e)
             raise
 
 
@@ -3,6 +3,7 @@ FastAPI server launcher
 Usage: python run.py
 """
 
+import sys
 import uvicorn
 from app.config import settings
 
@@ -31,4 +32,8 @@ if __name__ == "__main__":
         port=settings.API_PORT,
         reload=settings.API_RELOAD,
         log_level="info",
+        # uvloop has no Windows build; fall back to the stock loop there
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        access_log=False,  # errors already go to the AppLogs table
     )
@@ -0,0 +1,84 @@
+"""
+App wiring and API key middleware tests
+"""
+import asyncio
+
+import httpx
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.config import settings
+from app.main import app
+from app.middleware.auth_middleware import APIKeyMiddleware
+
+# Not a route: a request that gets past the auth middleware ends in 404
+UNKNOWN_PATH = "/no-such-route"
+
+
+def request(method: str, path: str, headers: dict = None) -> httpx.Response:
+    """Send one request through the ASGI stack (the lifespan is not run)"""
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, path, headers=headers)
+
+    return asyncio.run(send())
+
+
+def test_middleware_registered_once():
+    classes = [middleware.cls for middleware in app.user_middleware]
+    assert classes.count(CORSMiddleware) == 1
+    assert classes.count(APIKeyMiddleware) == 1
+
+
+def test_missing_api_key_is_rejected():
+    response = request("GET", UNKNOWN_PATH)
+    assert response.status_code == 401
+    assert response.json()["message"] == "API key is missing. Please provide X-API-Key header."
+
+
+def test_invalid_api_key_is_rejected():
+    response = request("GET", UNKNOWN_PATH, headers={"X-API-Key": "wrong-key"})
+    assert response.status_code == 401
+    assert response.json()["message"] == "Invalid API key."
+
+
+def test_valid_api_key_passes():
+    response = request("GET", UNKNOWN_PATH, headers={"X-API-Key": settings.Application_Auth_API_KEY})
+    assert response.status_code == 404
+
+
+def test_bearer_token_fallback():
+    response = request(
+        "GET", UNKNOWN_PATH, headers={"Authorization": f"Bearer {settings.Application_Auth_API_KEY}"}
+    )
+    assert response.status_code == 404
+
+    response = request("GET", UNKNOWN_PATH, headers={"Authorization": "Bearer wrong-key"})
+    assert response.status_code == 401
+
+
+def test_x_api_key_wins_over_bearer():
+    response = request(
+        "GET",
+        UNKNOWN_PATH,
+        headers={
+            "X-API-Key": "wrong-key",
+            "Authorization": f"Bearer {settings.Application_Auth_API_KEY}",
+        },
+    )
+    assert response.status_code == 401
+
+
+def test_excluded_paths_skip_auth():
+    assert request("GET", "/openapi.json").status_code == 200
+    assert request("GET", "/docs").status_code == 200
+
+
+def test_cors_preflight_skips_auth():
+    response = request(
+        "OPTIONS",
+        UNKNOWN_PATH,
+        headers={"Origin": "https://example.com", "Access-Control-Request-Method": "POST"},
+    )
+    assert response.status_code == 200
+    assert "access-control-allow-origin" in response.headers